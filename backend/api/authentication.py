@@ -0,0 +1,87 @@
+import hashlib
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+TOKEN_CACHE_KEY = 'auth-token:{}'
+
+# Поля пользователя в снимке: без хеша пароля и счетчиков.
+SNAPSHOT_FIELDS = (
+    'id',
+    'email',
+    'username',
+    'first_name',
+    'last_name',
+    'is_active',
+    'is_staff',
+    'is_superuser',
+)
+
+# Попадания и промахи кеша токенов в этом процессе.
+token_cache_stats = Counter()
+
+
+def get_token_cache_key(key):
+    """Ключ кеша по хешу токена: сам токен в кеш не попадает."""
+    return TOKEN_CACHE_KEY.format(hashlib.sha256(key.encode()).hexdigest())
+
+
+def forget_tokens(keys):
+    """После коммита удалить из кеша снимки пользователей для токенов."""
+    cache_keys = [get_token_cache_key(key) for key in keys]
+    if cache_keys:
+        transaction.on_commit(lambda: cache.delete_many(cache_keys))
+
+
+def make_snapshot(user):
+    return {field: getattr(user, field) for field in SNAPSHOT_FIELDS}
+
+
+def load_snapshot(snapshot):
+    """Пользователь из снимка, остальные поля отложены.
+
+    Отложенные поля читаются из базы при обращении, а save() такого
+    экземпляра пишет только загруженные поля, поэтому счетчики и
+    пароль не перезаписываются устаревшими значениями.
+    """
+    model = get_user_model()
+    # from_db ждет значения в порядке полей модели.
+    names = [
+        field.attname for field in model._meta.concrete_fields
+        if field.attname in snapshot
+    ]
+    return model.from_db(
+        model._default_manager.db,
+        names,
+        [snapshot[name] for name in names],
+    )
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication со снимком пользователя в кеше.
+
+    Снимок хранится AUTH_TOKEN_CACHE_TTL секунд и удаляется при выходе,
+    смене пароля, деактивации и любом другом сохранении пользователя,
+    кроме отметки о входе. Изменения в обход сигналов, например через
+    queryset.update, перестают действовать не позже, чем через TTL.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = get_token_cache_key(key)
+        snapshot = cache.get(cache_key)
+        if snapshot is not None:
+            token_cache_stats['hits'] += 1
+            user = load_snapshot(snapshot)
+            return user, Token(key=key, user=user)
+        token_cache_stats['misses'] += 1
+        user, token = super().authenticate_credentials(key)
+        cache.set(
+            cache_key, make_snapshot(user), settings.AUTH_TOKEN_CACHE_TTL
+        )
+        return user, token
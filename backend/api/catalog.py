@@ -0,0 +1,79 @@
+import gzip
+from threading import Lock
+
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework.renderers import JSONRenderer
+
+from core.versions import get_version
+
+
+class CatalogSnapshot:
+    """Готовый к отдаче снимок справочника.
+
+    Хранит в памяти процесса JSON и его gzip-версию для текущей версии
+    справочника и пересобирает их, когда версия меняется.
+    """
+
+    def __init__(self, version_name, queryset, serializer_class):
+        self.version_name = version_name
+        self.queryset = queryset
+        self.serializer_class = serializer_class
+        self._lock = Lock()
+        self._snapshot = (None, b'', b'')
+
+    def get(self):
+        version = get_version(self.version_name)
+        if self._snapshot[0] == version:
+            return self._snapshot
+        with self._lock:
+            if self._snapshot[0] != version:
+                serializer = self.serializer_class(
+                    self.queryset.all(), many=True
+                )
+                body = JSONRenderer().render(serializer.data)
+                self._snapshot = (version, body, gzip.compress(body))
+        return self._snapshot
+
+    def etag(self, version, encoding=''):
+        return f'"{self.version_name}-{version}{encoding}"'
+
+
+class CatalogSnapshotMixin:
+    """Отдача списка справочника из снимка с поддержкой условного GET."""
+    catalog = None
+
+    def is_not_modified(self, request, version, etags):
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            return bool(set(parse_etags(if_none_match)) & set(etags))
+        if_modified_since = parse_http_date_safe(
+            request.META.get('HTTP_IF_MODIFIED_SINCE', '')
+        )
+        return (
+            if_modified_since is not None
+            and version // 1000 <= if_modified_since
+        )
+
+    def list(self, request, *args, **kwargs):
+        version, body, compressed = self.catalog.get()
+        etags = (
+            self.catalog.etag(version), self.catalog.etag(version, '-gzip')
+        )
+        gzipped = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if self.is_not_modified(request, version, etags):
+            response = HttpResponseNotModified()
+        elif gzipped:
+            response = HttpResponse(
+                compressed, content_type='application/json'
+            )
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etags[gzipped]
+        response['Last-Modified'] = http_date(version // 1000)
+        response['X-Catalog-Version'] = version
+        response['Cache-Control'] = 'no-cache'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
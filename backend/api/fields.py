@@ -0,0 +1,151 @@
+import binascii
+import uuid
+from base64 import b64decode
+from functools import lru_cache
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from drf_extra_fields.fields import Base64ImageField
+from PIL import Image, UnidentifiedImageError
+from rest_framework import serializers
+
+from core.storage import content_addressed_storage
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """Ссылки на уменьшенные копии изображения рецепта.
+
+    Пока копии для текущего изображения не готовы, возвращает None.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        return get_image_variants(recipe, self.context.get('request'))
+
+
+def get_image_variants(recipe, request):
+    """Ссылки на копии изображения рецепта или None, если их еще нет."""
+    variants = recipe.image_variants
+    if not recipe.image or variants.get('source') != recipe.image.name:
+        return None
+    return {
+        size: {
+            extension: build_url(request, name)
+            for extension, name in formats.items()
+        }
+        for size, formats in variants['sizes'].items()
+    }
+
+
+@lru_cache(maxsize=10000)
+def get_media_url(base_url, name):
+    """Ссылка хранилища на файл; имена из хеша не меняют смысла."""
+    return content_addressed_storage.url(name)
+
+
+def build_url(request, name):
+    """Абсолютная ссылка на файл, как request.build_absolute_uri.
+
+    Для путей от корня сайта префикс схемы и хоста вычисляется один
+    раз на запрос, а не разбором каждой ссылки.
+    """
+    return make_absolute_url(
+        request, get_media_url(content_addressed_storage.base_url, name)
+    )
+
+
+def make_absolute_url(request, url):
+    """Абсолютная ссылка из ссылки хранилища с префиксом на запрос."""
+    if request is None:
+        return url
+    if not url.startswith('/') or url.startswith('//') or '/.' in url:
+        return request.build_absolute_uri(url)
+    prefix = getattr(request, '_media_url_prefix', None)
+    if prefix is None:
+        prefix = request.build_absolute_uri('/')[:-1]
+        request._media_url_prefix = prefix
+    return prefix + url
+
+
+class StreamingBase64ImageField(Base64ImageField):
+    """Base64ImageField с декодированием по частям во временный файл.
+
+    Строка base64 к этому моменту уже разобрана из JSON, поэтому поле
+    не ограничивает память запроса: это делают парсеры api.parsers по
+    REQUEST_BODY_MAX_BYTES. Поле не создает второй копии декодированных
+    данных в памяти и проверяет размер в байтах по длине строки до
+    декодирования, а размеры в пикселях — по заголовку изображения до
+    распаковки пикселей.
+    """
+    chunk_size = 64 * 1024
+    default_error_messages = {
+        'too_large': 'Размер изображения больше {max_bytes} байт.',
+        'too_many_pixels': 'Изображение больше {max_pixels} пикселей.',
+    }
+
+    def to_internal_value(self, data):
+        if data in self.EMPTY_VALUES:
+            return None
+        if not isinstance(data, str):
+            self.fail('invalid_image')
+        header, _, payload = data.rpartition(';base64,')
+        if len(payload) * 3 // 4 > settings.IMAGE_UPLOAD_MAX_BYTES:
+            self.fail('too_large', max_bytes=settings.IMAGE_UPLOAD_MAX_BYTES)
+        file = SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+        )
+        try:
+            size = self.decode(payload, file)
+            extension = self.check_image(file)
+        except Exception:
+            file.close()
+            raise
+        file.seek(0)
+        return UploadedFile(
+            file=file,
+            name=f'{uuid.uuid4()}.{extension}',
+            content_type=header.replace('data:', '') or None,
+            size=size,
+        )
+
+    def decode(self, payload, file):
+        """Декодировать base64 блоками, кратными четырем символам."""
+        size = 0
+        rest = ''
+        for start in range(0, len(payload), self.chunk_size):
+            chunk = rest + ''.join(
+                payload[start:start + self.chunk_size].split()
+            )
+            end = len(chunk) - len(chunk) % 4
+            rest = chunk[end:]
+            try:
+                size += file.write(b64decode(chunk[:end], validate=True))
+            except binascii.Error:
+                self.fail('invalid_image')
+        if rest:
+            self.fail('invalid_image')
+        return size
+
+    def check_image(self, file):
+        file.seek(0)
+        try:
+            with Image.open(file) as image:
+                width, height = image.size
+                if width * height > settings.IMAGE_UPLOAD_MAX_PIXELS:
+                    self.fail(
+                        'too_many_pixels',
+                        max_pixels=settings.IMAGE_UPLOAD_MAX_PIXELS
+                    )
+                image.verify()
+                extension = image.format.lower()
+        except (UnidentifiedImageError, OSError, SyntaxError,
+                Image.DecompressionBombError):
+            self.fail('invalid_image')
+        extension = 'jpg' if extension == 'jpeg' else extension
+        if extension not in self.ALLOWED_TYPES:
+            self.fail('invalid_image')
+        return extension
@@ -1,5 +1,6 @@
 from django_filters.rest_framework import FilterSet, filters
 
+from api.utils import get_user_memberships
 from recipes.models import Recipe, Tag
 from users.models import User
 
@@ -33,11 +34,15 @@ class RecipeFilter(FilterSet):
         )
 
     def get_is_favorited(self, queryset, name, value):
-        if value:
-            return queryset.filter(favorites__user=self.request.user)
-        return queryset
+        if not value:
+            return queryset
+        return queryset.filter(
+            id__in=list(get_user_memberships(self.request).favorites)
+        )
 
     def get_is_in_shopping_cart(self, queryset, name, value):
-        if value:
-            return queryset.filter(cart__user=self.request.user)
-        return queryset
+        if not value:
+            return queryset
+        return queryset.filter(
+            id__in=list(get_user_memberships(self.request).shopping_cart)
+        )
@@ -0,0 +1,176 @@
+import json
+import time
+from argparse import ArgumentTypeError
+import tracemalloc
+from itertools import cycle
+
+from django.core.cache import cache
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import setup_test_environment
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.authentication import token_cache_stats
+from core.queries import collect_queries
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise ArgumentTypeError('значение должно быть не меньше 1')
+    return number
+
+
+def percentile(values, share):
+    """Значение с рангом share по методу ближайшего ранга."""
+    values = sorted(values)
+    return values[max(round(share * len(values)) - 1, 0)]
+
+
+def get_scenarios(user):
+    """Сценарии: имя, нужна ли авторизация и бесконечный поток адресов."""
+    slugs = list(Tag.objects.values_list('slug', flat=True)[:2])
+    recipes = list(Recipe.objects.order_by(
+        '-favorites_count'
+    ).values_list('id', flat=True)[:50])
+    prefixes = sorted({
+        name[:2] for name in
+        Ingredient.objects.values_list('name', flat=True)[:500]
+    })
+    tags = '&'.join(f'tags={slug}' for slug in slugs)
+    return (
+        ('feed', False, cycle(['/api/recipes/'])),
+        ('feed_tags', False, cycle([f'/api/recipes/?{tags}'])),
+        ('feed_cursor', False, cycle(['/api/recipes/?pagination=cursor'])),
+        ('feed_auth', True, cycle(['/api/recipes/'])),
+        ('feed_favorited', True, cycle(['/api/recipes/?is_favorited=1'])),
+        ('recipe_detail', True, cycle(
+            f'/api/recipes/{pk}/' for pk in recipes
+        )),
+        ('subscriptions', True, cycle(
+            ['/api/users/subscriptions/?recipes_limit=3']
+        )),
+        ('download_shopping_cart', True, cycle(
+            ['/api/recipes/download_shopping_cart/']
+        )),
+        ('ingredient_search', False, cycle(
+            f'/api/ingredients/?name={prefix}' for prefix in prefixes
+        )),
+    )
+
+
+class Command(BaseCommand):
+    help = 'Замер задержек, числа запросов и выделений памяти для API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=positive_int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--allocations', type=int, default=5,
+            help='Сколько запросов сценария прогнать под tracemalloc',
+        )
+        parser.add_argument(
+            '--cold',
+            action='store_true',
+            help='Очищать кеш перед каждым запросом',
+        )
+        parser.add_argument(
+            '--scenario', action='append', default=[],
+            help='Запустить только указанные сценарии',
+        )
+        parser.add_argument(
+            '--output', help='Файл для отчета, по умолчанию stdout',
+        )
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        user = User.objects.annotate(
+            cart_size=Count('cart')
+        ).order_by('-cart_size', '-followers_count').first()
+        if user is None or not Recipe.objects.exists():
+            raise CommandError('Нет данных: запустите generate_dataset')
+        clients = {False: APIClient(), True: APIClient()}
+        token, _ = Token.objects.get_or_create(user=user)
+        clients[True].credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.options = options
+        report = {
+            'meta': {
+                'started': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'recipes': Recipe.objects.count(),
+                'users': User.objects.count(),
+                'iterations': options['iterations'],
+                'cold_cache': options['cold'],
+            },
+            'scenarios': {},
+        }
+        for name, auth, paths in get_scenarios(user):
+            if options['scenario'] and name not in options['scenario']:
+                continue
+            report['scenarios'][name] = self.run_scenario(
+                clients[auth], paths
+            )
+        self.write_report(report)
+
+    def request(self, client, path):
+        if self.options['cold']:
+            cache.clear()
+        response = client.get(path)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        if response.status_code != 200:
+            raise CommandError(f'{path}: ответ {response.status_code}')
+        return response
+
+    def run_scenario(self, client, paths):
+        for _ in range(self.options['warmup']):
+            self.request(client, next(paths))
+        timings = []
+        queries = []
+        auth_before = token_cache_stats.copy()
+        for _ in range(self.options['iterations']):
+            path = next(paths)
+            with collect_queries() as stats:
+                start = time.perf_counter()
+                self.request(client, path)
+                timings.append((time.perf_counter() - start) * 1000)
+            queries.append(stats.count)
+        auth = token_cache_stats - auth_before
+        return {
+            'p50_ms': round(percentile(timings, 0.5), 2),
+            'p95_ms': round(percentile(timings, 0.95), 2),
+            'mean_ms': round(sum(timings) / len(timings), 2),
+            'queries_mean': round(sum(queries) / len(queries), 2),
+            'queries_max': max(queries),
+            'auth_cache_hits': auth['hits'],
+            'auth_cache_misses': auth['misses'],
+            'alloc_peak_kb': self.measure_allocations(client, paths),
+        }
+
+    def measure_allocations(self, client, paths):
+        """Пик выделенной памяти за запрос, медиана по нескольким."""
+        peaks = []
+        for _ in range(self.options['allocations']):
+            tracemalloc.start()
+            try:
+                self.request(client, next(paths))
+                peaks.append(tracemalloc.get_traced_memory()[1])
+            finally:
+                tracemalloc.stop()
+        return round(percentile(peaks, 0.5) / 1024, 1) if peaks else None
+
+    def write_report(self, report):
+        text = json.dumps(report, ensure_ascii=False, indent=2)
+        if self.options['output']:
+            with open(self.options['output'], 'w', encoding='utf-8') as file:
+                file.write(text)
+            self.stdout.write(self.style.SUCCESS(
+                f'Отчет записан в {self.options["output"]}'
+            ))
+            return
+        self.stdout.write(text)
@@ -0,0 +1,105 @@
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import BaseCommand, CommandError
+from django.db.models import Count
+from django.test.utils import setup_test_environment
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.renderers import FastJSONRenderer
+from api.representations import FastRecipeReadSerializer
+from api.serializers import RecipeReadSerializer
+from api.views import RecipeViewSet
+from users.models import User
+
+
+PATHS = (
+    (RecipeReadSerializer, JSONRenderer),
+    (FastRecipeReadSerializer, FastJSONRenderer),
+)
+
+
+def render(serializer_class, renderer_class, recipes, request):
+    data = serializer_class(
+        recipes, many=True, context={'request': request}
+    ).data
+    return renderer_class().render(data)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверка быстрого чтения рецептов с RecipeReadSerializer '
+        'и замер скорости'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        reader = User.objects.annotate(
+            favorites_total=Count('favorites')
+        ).order_by('-favorites_total').first()
+        for user in (AnonymousUser(), reader):
+            if user is None:
+                continue
+            request = self.get_request(user)
+            recipes = self.get_recipes(request, options['recipes'])
+            if not recipes:
+                raise CommandError('Нет рецептов: запустите generate_dataset')
+            self.check_conformance(recipes, request)
+            self.benchmark(recipes, request, options['repeat'])
+
+    @staticmethod
+    def get_request(user):
+        request = Request(APIRequestFactory().get('/api/recipes/'))
+        request.user = user
+        return request
+
+    @staticmethod
+    def get_recipes(request, count):
+        view = RecipeViewSet(request=request, format_kwarg=None)
+        view.action = 'list'
+        return list(view.get_queryset()[:count])
+
+    def check_conformance(self, recipes, request):
+        reference, fast = (
+            render(serializer_class, renderer_class, recipes, request)
+            for serializer_class, renderer_class in PATHS
+        )
+        if reference == fast:
+            self.stdout.write(self.style.SUCCESS(
+                f'[{request.user}] ответы совпадают побайтно, '
+                f'{len(reference)} байт'
+            ))
+            return
+        for recipe in recipes:
+            single = [
+                render(serializer_class, renderer_class, [recipe], request)
+                for serializer_class, renderer_class in PATHS
+            ]
+            if single[0] != single[1]:
+                raise CommandError(
+                    f'Рецепт {recipe.id} отличается:\n'
+                    f'{single[0].decode()}\n{single[1].decode()}'
+                )
+        raise CommandError('Ответы отличаются')
+
+    def benchmark(self, recipes, request, repeat):
+        results = []
+        for serializer_class, renderer_class in PATHS:
+            start = time.perf_counter()
+            for _ in range(repeat):
+                render(serializer_class, renderer_class, recipes, request)
+            duration = time.perf_counter() - start
+            results.append(duration)
+            self.stdout.write(
+                f'{serializer_class.__name__} + {renderer_class.__name__}: '
+                f'{len(recipes) * repeat / duration:.0f} рецептов/с'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Ускорение: {results[0] / results[1]:.1f}x'
+        ))
@@ -0,0 +1,13 @@
+from django.core.management import BaseCommand, call_command
+
+
+class Command(BaseCommand):
+    help = 'Проверка бюджетов SQL-запросов для маршрутов API'
+
+    def handle(self, *args, **options):
+        call_command(
+            'test',
+            'api.tests.test_query_budgets',
+            verbosity=options['verbosity'],
+            interactive=False,
+        )
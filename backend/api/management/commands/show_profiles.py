@@ -0,0 +1,69 @@
+import io
+import json
+import pstats
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Список сохраненных профилей запросов и разбор одного из них'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'profile', nargs='?',
+            help='Имя профиля из заголовка X-Profile-Id',
+        )
+        parser.add_argument(
+            '--sort', default='cumulative',
+            help='Сортировка функций pstats (cumulative, tottime, ncalls)',
+        )
+        parser.add_argument('--limit', type=int, default=25)
+
+    def handle(self, *args, **options):
+        directory = Path(settings.PROFILING_DIR)
+        if options['profile']:
+            self.show(directory, options)
+        else:
+            self.list(directory)
+
+    def list(self, directory):
+        summaries = sorted(directory.glob('*.json'))
+        if not summaries:
+            self.stdout.write(f'Профилей нет в {directory}')
+            return
+        self.stdout.write(
+            f'{"профиль":60} {"статус":>6} {"всего":>9} {"sql":>9} '
+            f'{"python":>9} {"запросов":>8}'
+        )
+        for path in summaries:
+            summary = json.loads(path.read_text(encoding='utf-8'))
+            self.stdout.write(
+                f'{path.stem:60} {summary["status"]:>6} '
+                f'{summary["total_ms"]:>9} {summary["sql_ms"]:>9} '
+                f'{summary["python_ms"]:>9} {summary["queries"]:>8}'
+            )
+
+    def show(self, directory, options):
+        name = options['profile']
+        summary_path = directory / f'{name}.json'
+        if not summary_path.exists():
+            raise CommandError(f'Профиль {name} не найден в {directory}')
+        summary = json.loads(summary_path.read_text(encoding='utf-8'))
+        self.stdout.write(
+            f'{summary["method"]} {summary["path"]} -> {summary["status"]}\n'
+            f'всего {summary["total_ms"]} мс: SQL {summary["sql_ms"]} мс '
+            f'({summary["queries"]} запросов), '
+            f'Python {summary["python_ms"]} мс'
+        )
+        for sql, count in summary['duplicates'].items():
+            self.stdout.write(f'  повтор x{count}: {sql}')
+        # OutputWrapper добавляет перевод строки к каждой записи,
+        # поэтому pstats пишет в буфер.
+        buffer = io.StringIO()
+        stats = pstats.Stats(str(directory / f'{name}.prof'), stream=buffer)
+        stats.strip_dirs().sort_stats(options['sort']).print_stats(
+            options['limit']
+        )
+        self.stdout.write(buffer.getvalue())
@@ -0,0 +1,195 @@
+import json
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+from datetime import datetime
+from hashlib import md5
+from urllib import parse
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    BasePagination,
+    PageNumberPagination,
+    _positive_int,
+)
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from core.versions import get_versions
+
+
+class CachedCountPagination(PageNumberPagination):
+    """Постраничная пагинация с кешированием общего количества.
+
+    Количество кешируется по нормализованным параметрам фильтрации
+    на PAGINATION_COUNT_CACHE_TTL секунд. Ключ включает версии моделей
+    из view.count_versions, поэтому запись в них сбрасывает кеш.
+    На PostgreSQL при оценке планировщика выше
+    PAGINATION_COUNT_ESTIMATE_THRESHOLD строк точный COUNT не
+    выполняется, а в ответе count_exact равен False.
+    """
+    ignored_query_params = ('page', 'limit', 'cursor', 'pagination')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count_key = self.get_count_key(request, view)
+        self.count_exact = True
+        return super().paginate_queryset(queryset, request, view)
+
+    def django_paginator_class(self, object_list, per_page):
+        paginator = Paginator(object_list, per_page)
+        paginator.count = self.get_count(object_list)
+        return paginator
+
+    def get_count_key(self, request, view):
+        params = sorted(
+            (key, sorted(values))
+            for key, values in request.query_params.lists()
+            if key not in self.ignored_query_params
+        )
+        versions = get_versions(getattr(view, 'count_versions', ()))
+        user_id = request.user.id if request.user.is_authenticated else 0
+        digest = md5(
+            json.dumps([request.path, user_id, versions, params]).encode()
+        ).hexdigest()
+        return f'pagination-count:{digest}'
+
+    def get_count(self, queryset):
+        cached = cache.get(self.count_key)
+        if cached is None:
+            cached = self.estimate_count(queryset)
+            if cached is None:
+                cached = (queryset.count(), True)
+            cache.set(
+                self.count_key, cached, settings.PAGINATION_COUNT_CACHE_TTL
+            )
+        count, self.count_exact = cached
+        return count
+
+    def estimate_count(self, queryset):
+        """Оценка количества строк планировщиком PostgreSQL."""
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        rows = plan[0]['Plan']['Plan Rows']
+        if rows < settings.PAGINATION_COUNT_ESTIMATE_THRESHOLD:
+            return None
+        return rows, False
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.page.paginator.count),
+            ('count_exact', self.count_exact),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+
+class RecipeCursorPagination(BasePagination):
+    """Keyset-пагинация ленты рецептов по (pub_date, id).
+
+    Страница выбирается условием по ключу последней записи, поэтому нет
+    ни COUNT, ни OFFSET, и глубокие страницы стоят столько же, сколько
+    первая. Курсор непрозрачный: ключ записи в base64.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.cursor = self.decode_cursor(request)
+        queryset = queryset.order_by('-pub_date', '-id')
+        if self.cursor is not None:
+            reverse, pub_date, pk = self.cursor
+            if reverse:
+                queryset = queryset.filter(
+                    Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, id__gt=pk)
+                ).order_by('pub_date', 'id')
+            else:
+                queryset = queryset.filter(
+                    Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=pk)
+                )
+        self.page = list(queryset[:self.page_size + 1])
+        has_more = len(self.page) > self.page_size
+        del self.page[self.page_size:]
+        reverse = self.cursor is not None and self.cursor[0]
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(False, self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(True, self.page[0])
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            tokens = parse.parse_qs(
+                b64decode(encoded.encode('ascii')).decode('ascii'),
+                keep_blank_values=True
+            )
+            return (
+                bool(int(tokens.get('r', ['0'])[0])),
+                datetime.fromisoformat(tokens['p'][0]),
+                int(tokens['i'][0]),
+            )
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, reverse, recipe):
+        tokens = {'p': recipe.pub_date.isoformat(), 'i': recipe.id}
+        if reverse:
+            tokens['r'] = '1'
+        encoded = b64encode(
+            parse.urlencode(tokens, doseq=True).encode('ascii')
+        ).decode('ascii')
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded
+        )
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
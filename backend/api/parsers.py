@@ -0,0 +1,49 @@
+import io
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
+
+
+class RequestTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Размер запроса больше {max_bytes} байт.'
+    default_code = 'request_too_large'
+
+    def __init__(self, max_bytes):
+        super().__init__(self.default_detail.format(max_bytes=max_bytes))
+
+
+class LimitedBodyMixin:
+    """Отклонить тело больше REQUEST_BODY_MAX_BYTES до разбора.
+
+    Запрос с большим Content-Length отклоняется без чтения тела,
+    без заголовка тело читается не дальше предела плюс один байт.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        max_bytes = settings.REQUEST_BODY_MAX_BYTES
+        meta = parser_context['request'].META
+        try:
+            length = int(meta.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+        if length > max_bytes:
+            raise RequestTooLarge(max_bytes)
+        body = stream.read(max_bytes + 1)
+        if len(body) > max_bytes:
+            raise RequestTooLarge(max_bytes)
+        return super().parse(io.BytesIO(body), media_type, parser_context)
+
+
+class LimitedJSONParser(LimitedBodyMixin, JSONParser):
+    pass
+
+
+class LimitedFormParser(LimitedBodyMixin, FormParser):
+    pass
+
+
+class LimitedMultiPartParser(LimitedBodyMixin, MultiPartParser):
+    pass
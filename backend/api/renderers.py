@@ -0,0 +1,68 @@
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer на orjson для ответов из простых типов.
+
+    При настройках DRF по умолчанию вывод совпадает с JSONRenderer
+    побайтно: компактный UTF-8, U+2028 и U+2029 экранированы, даты
+    форматирует кодировщик DRF. Отступы, другие настройки и данные,
+    которые orjson не принимает, отдаются JSONRenderer. Числа с
+    плавающей точкой orjson пишет по-своему, поэтому рендерер
+    подключается только к ответам без них.
+    """
+    options = orjson.OPT_PASSTHROUGH_DATETIME
+    default = encoders.JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if (
+            indent is not None
+            or not self.compact
+            or self.ensure_ascii
+            or not self.strict
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            content = orjson.dumps(
+                data, default=self.default, option=self.options
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        return content.replace(
+            '\u2028'.encode(), b'\\u2028'
+        ).replace(
+            '\u2029'.encode(), b'\\u2029'
+        )
+
+
+class ShoppingListRenderer(BaseRenderer):
+    """Базовый рендерер списка покупок.
+
+    Сам список отдается потоком в обход рендерера, здесь рендерятся
+    только ответы с ошибками.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, dict):
+            data = '\n'.join(
+                f'{key}: {value}' for key, value in data.items()
+            )
+        return str(data).encode(self.charset)
+
+
+class ShoppingListTextRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+
+class ShoppingListCSVRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
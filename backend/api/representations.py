@@ -0,0 +1,211 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+from api.fields import get_image_variants, get_media_url, make_absolute_url
+from api.utils import get_user_memberships
+from core.storage import content_addressed_storage
+from core.versions import get_object_version_name, get_versions
+from recipes.models import Recipe
+from users.models import User
+
+
+class FastRecipeReadSerializer(serializers.BaseSerializer):
+    """Быстрый аналог RecipeReadSerializer для чтения рецептов.
+
+    Собирает те же словари с тем же порядком ключей и типами значений
+    прямо из строк с select_related автора и prefetch ингредиентов
+    и тегов, без дерева полей DRF. Совпадение ответа с
+    RecipeReadSerializer проверяют api.tests.test_representations
+    и команда benchmark_serializers.
+    """
+
+    def to_representation(self, recipe):
+        request = self.context.get('request')
+        memberships = get_user_memberships(request)
+        return apply_user_data(
+            get_shared_representation(recipe),
+            request,
+            recipe.id in memberships.favorites,
+            recipe.id in memberships.shopping_cart,
+            recipe.author_id in memberships.subscriptions,
+        )
+
+
+def get_shared_representation(recipe):
+    """Не зависящая от пользователя часть представления рецепта.
+
+    Флаги пользователя заполнены False, ссылки на файлы — от корня
+    сайта: и то и другое подставляет apply_user_data.
+    """
+    author = recipe.author
+    return {
+        'id': recipe.id,
+        'tags': [
+            {
+                'id': tag.id,
+                'name': tag.name,
+                'color': tag.color,
+                'slug': tag.slug,
+            }
+            for tag in recipe.tags.all()
+        ],
+        'author': {
+            'email': author.email,
+            'id': author.id,
+            'username': author.username,
+            'first_name': author.first_name,
+            'last_name': author.last_name,
+            'is_subscribed': False,
+        },
+        'ingredients': [
+            {
+                'id': item.ingredient.id,
+                'name': item.ingredient.name,
+                'measurement_unit': item.ingredient.measurement_unit,
+                'amount': item.amount,
+            }
+            for item in recipe.amount_ingredients.all()
+        ],
+        'is_favorited': False,
+        'is_in_shopping_cart': False,
+        'name': recipe.name,
+        'image': get_image_url(recipe),
+        'image_variants': get_image_variants(recipe, None),
+        'text': recipe.text,
+        'cooking_time': recipe.cooking_time,
+    }
+
+
+def apply_user_data(data, request, is_favorited, is_in_shopping_cart,
+                    is_subscribed):
+    """Дополнить общую часть представления данными пользователя."""
+    data['author']['is_subscribed'] = bool(is_subscribed)
+    data['is_favorited'] = bool(is_favorited)
+    data['is_in_shopping_cart'] = bool(is_in_shopping_cart)
+    if data['image'] and api_settings.UPLOADED_FILES_USE_URL:
+        data['image'] = make_absolute_url(request, data['image'])
+    for formats in (data['image_variants'] or {}).values():
+        for extension, url in formats.items():
+            formats[extension] = make_absolute_url(request, url)
+    return data
+
+
+def get_image_url(recipe):
+    """Ссылка на изображение как в ImageField DRF, но без хоста."""
+    name = recipe.image.name
+    if not name:
+        return None
+    if not api_settings.UPLOADED_FILES_USE_URL:
+        return name
+    return get_media_url(content_addressed_storage.base_url, name)
+
+
+class RecipeRepresentationCache:
+    """Кеш не зависящей от пользователя части представления рецептов.
+
+    Запись хранит представление и версии, с которыми оно собрано:
+    каталогов ингредиентов и тегов, самого рецепта и его автора.
+    Запись с устаревшими версиями не используется и пересобирается,
+    поэтому явного удаления из кеша не требуется.
+    """
+    key = 'recipe-representation:{}'
+    shared_versions = ('ingredients', 'tags')
+
+    def represent(self, recipe_ids, request):
+        """Представления рецептов для пользователя запроса.
+
+        Порядок совпадает с recipe_ids, несуществующие рецепты
+        пропускаются.
+        """
+        shared = self.get_many(recipe_ids)
+        memberships = get_user_memberships(request)
+        return [
+            apply_user_data(
+                shared[pk],
+                request,
+                pk in memberships.favorites,
+                pk in memberships.shopping_cart,
+                shared[pk]['author']['id'] in memberships.subscriptions,
+            )
+            for pk in recipe_ids
+            if pk in shared
+        ]
+
+    def get_many(self, recipe_ids):
+        keys = [self.key.format(pk) for pk in recipe_ids]
+        cached = cache.get_many(keys)
+        versions = self.read_versions([
+            *self.shared_versions,
+            *(get_object_version_name(Recipe, pk) for pk in recipe_ids),
+            *(
+                get_object_version_name(User, entry['data']['author']['id'])
+                for entry in cached.values()
+            ),
+        ])
+        result = {}
+        for pk, key in zip(recipe_ids, keys):
+            entry = cached.get(key)
+            if entry is not None and entry['versions'] == self.get_versions(
+                versions, pk, entry['data']['author']['id']
+            ):
+                result[pk] = entry['data']
+        missing = [pk for pk in recipe_ids if pk not in result]
+        if missing:
+            result.update(self.load(missing, versions))
+        return result
+
+    def load(self, recipe_ids, versions):
+        """Собрать и сохранить недостающие записи.
+
+        Все версии прочитаны до выборки тех данных, которые они
+        покрывают: версии рецептов — до выборки рецептов, версии
+        авторов — до выборки авторов отдельным запросом. Изменение,
+        закоммиченное между ними, сделает запись устаревшей, а не
+        оставит в кеше старые данные под новой версией.
+        """
+        recipes = list(Recipe.objects.prefetch_related(
+            'amount_ingredients__ingredient', 'tags'
+        ).filter(pk__in=recipe_ids))
+        author_ids = {recipe.author_id for recipe in recipes}
+        versions.update(self.read_versions([
+            name for name in (
+                get_object_version_name(User, author_id)
+                for author_id in author_ids
+            )
+            if name not in versions
+        ]))
+        authors = User.objects.in_bulk(author_ids)
+        for recipe in recipes:
+            recipe.author = authors[recipe.author_id]
+        result = {}
+        entries = {}
+        for recipe in recipes:
+            data = get_shared_representation(recipe)
+            entries[self.key.format(recipe.pk)] = {
+                'versions': self.get_versions(
+                    versions, recipe.pk, recipe.author_id
+                ),
+                'data': data,
+            }
+            result[recipe.pk] = data
+        cache.set_many(entries, settings.RECIPE_CACHE_TTL)
+        return result
+
+    @staticmethod
+    def read_versions(names):
+        names = list(dict.fromkeys(names))
+        return dict(zip(names, get_versions(names)))
+
+    def get_versions(self, versions, recipe_id, author_id):
+        return [
+            versions[name] for name in (
+                *self.shared_versions,
+                get_object_version_name(Recipe, recipe_id),
+                get_object_version_name(User, author_id),
+            )
+        ]
+
+
+recipe_cache = RecipeRepresentationCache()
@@ -0,0 +1,58 @@
+from bisect import bisect_left
+from threading import Lock
+
+from core.versions import get_version
+from recipes.models import Ingredient
+
+
+class IngredientPrefixIndex:
+    """Процессный индекс названий ингредиентов для поиска по префиксу.
+
+    Строится при первом запросе и перестраивается, когда меняется
+    версия каталога ингредиентов.
+    """
+    version_name = 'ingredients'
+
+    def __init__(self):
+        self._lock = Lock()
+        self._version = None
+        self._data = ([], [])
+
+    def _refresh(self):
+        version = get_version(self.version_name)
+        if version == self._version:
+            return
+        with self._lock:
+            if version == self._version:
+                return
+            items = sorted(
+                (
+                    {
+                        'id': pk,
+                        'name': name,
+                        'measurement_unit': measurement_unit,
+                    }
+                    for pk, name, measurement_unit
+                    in Ingredient.objects.values_list(
+                        'id', 'name', 'measurement_unit'
+                    ).order_by()
+                ),
+                key=lambda item: (item['name'].lower(), item['id'])
+            )
+            self._data = ([item['name'].lower() for item in items], items)
+            self._version = version
+
+    def search(self, prefix, limit):
+        self._refresh()
+        keys, items = self._data
+        prefix = prefix.lower()
+        position = bisect_left(keys, prefix)
+        end = min(position + limit, len(keys))
+        result = []
+        while position < end and keys[position].startswith(prefix):
+            result.append(items[position])
+            position += 1
+        return result
+
+
+ingredient_index = IngredientPrefixIndex()
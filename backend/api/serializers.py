@@ -1,19 +1,22 @@
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError
+from django.db.models import prefetch_related_objects
 from django.db.transaction import atomic
-from django.shortcuts import get_object_or_404
 from djoser.serializers import UserSerializer as DjoserUserSerialiser
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 from rest_framework.fields import SerializerMethodField
-from rest_framework.validators import UniqueTogetherValidator
-from rest_framework.serializers import BooleanField
+from rest_framework.settings import api_settings
 
+from api.fields import ImageVariantsField, StreamingBase64ImageField
+from api.utils import get_recipes_limit, get_user_memberships
 from recipes.models import (
     Favorite,
     Ingredient,
     IngredientRecipes,
     Recipe,
     ShoppingCart,
+    ShoppingListItem,
     Tag,
 )
 from users.models import Subscription
@@ -21,6 +24,10 @@ from users.models import Subscription
 
 User = get_user_model()
 
+MIN_AMOUNT = 1
+MAX_AMOUNT = 32767
+MAX_BULK_IDS = 100
+
 
 class UserSerializer(DjoserUserSerialiser):
     """Сериалайзер для модели User."""
@@ -38,13 +45,9 @@ class UserSerializer(DjoserUserSerialiser):
         )
 
     def get_is_subscribed(self, obj):
-        user = self.context.get('request').user
-        if user is None or user.is_anonymous:
-            return False
-        return Subscription.objects.filter(
-            user=user,
-            author=obj
-        ).exists()
+        return obj.id in get_user_memberships(
+            self.context.get('request')
+        ).subscriptions
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -79,8 +82,13 @@ class IngredientRecipeReadSerializer(serializers.ModelSerializer):
 
 
 class IngredientRecipeWriteSerializer(serializers.ModelSerializer):
-    """"Сериалайзер для модели IngredientRecipes."""
+    """"Сериалайзер для модели IngredientRecipes.
+
+    Существование ингредиента и допустимость количества проверяются
+    сразу для всего списка в RecipeWriteSerializer.validate_ingredients.
+    """
     id = serializers.IntegerField()
+    amount = serializers.IntegerField()
 
     class Meta:
         model = IngredientRecipes
@@ -108,11 +116,12 @@ class RecipeReadSerializer(serializers.ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
     author = UserSerializer(read_only=True)
     image = Base64ImageField(read_only=True)
+    image_variants = ImageVariantsField()
     ingredients = IngredientRecipeReadSerializer(
         many=True, source='amount_ingredients'
     )
-    is_favorited = BooleanField(read_only=True, default=False)
-    is_in_shopping_cart = BooleanField(read_only=True, default=False)
+    is_favorited = SerializerMethodField()
+    is_in_shopping_cart = SerializerMethodField()
 
     class Meta:
         model = Recipe
@@ -125,16 +134,27 @@ class RecipeReadSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_variants',
             'text',
             'cooking_time',
         )
 
+    def get_is_favorited(self, obj):
+        return obj.id in get_user_memberships(
+            self.context.get('request')
+        ).favorites
+
+    def get_is_in_shopping_cart(self, obj):
+        return obj.id in get_user_memberships(
+            self.context.get('request')
+        ).shopping_cart
+
 
 class RecipeWriteSerializer(serializers.ModelSerializer):
     """Сериализатор для модели Recipe."""
     author = UserSerializer(read_only=True)
     ingredients = IngredientRecipeWriteSerializer(many=True)
-    image = Base64ImageField()
+    image = StreamingBase64ImageField()
 
     class Meta:
         model = Recipe
@@ -149,11 +169,42 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             'cooking_time',
         )
 
+    def validate_ingredients(self, value):
+        """Проверить весь список ингредиентов одним запросом.
+
+        Ошибки возвращаются списком по позициям, как у вложенных
+        сериализаторов: неизвестные и повторные id, количество вне
+        допустимых границ.
+        """
+        ingredients = Ingredient.objects.in_bulk(
+            {item['id'] for item in value}
+        )
+        errors = []
+        seen = set()
+        for item in value:
+            error = {}
+            if item['id'] not in ingredients:
+                error['id'] = [f'Ингредиента с id {item["id"]} нет.']
+            elif item['id'] in seen:
+                error['id'] = ['Ингредиент указан повторно.']
+            if not MIN_AMOUNT <= item['amount'] <= MAX_AMOUNT:
+                error['amount'] = [
+                    f'Количество должно быть от {MIN_AMOUNT} '
+                    f'до {MAX_AMOUNT}.'
+                ]
+            seen.add(item['id'])
+            errors.append(error)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return [
+            {'ingredient': ingredients[item['id']], 'amount': item['amount']}
+            for item in value
+        ]
+
     def create_ingredients(self, ingredients, recipe):
-        queryset = Ingredient.objects.all()
         IngredientRecipes.objects.bulk_create([
             IngredientRecipes(
-                ingredient=get_object_or_404(queryset, id=ingredient['id']),
+                ingredient=ingredient['ingredient'],
                 recipe=recipe,
                 amount=ingredient['amount']
             ) for ingredient in ingredients
@@ -168,18 +219,63 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         self.create_ingredients(recipe=recipe, ingredients=ingredients)
         return recipe
 
+    def update_tags(self, recipe, tags):
+        current = {tag.id for tag in recipe.tags.all()}
+        new = {tag.id for tag in tags}
+        if current - new:
+            recipe.tags.remove(*(current - new))
+        if new - current:
+            recipe.tags.add(*(new - current))
+
+    def update_ingredients(self, recipe, ingredients):
+        """Применить к ингредиентам рецепта только изменившиеся строки."""
+        current = {
+            row.ingredient_id: row
+            for row in recipe.amount_ingredients.all()
+        }
+        new = {item['ingredient'].id: item for item in ingredients}
+        deltas = {}
+        updated = []
+        for ingredient_id, row in current.items():
+            amount = new.get(ingredient_id, {'amount': 0})['amount']
+            if amount != row.amount:
+                deltas[ingredient_id] = amount - row.amount
+                row.amount = amount
+                updated.append(row)
+        created = [
+            IngredientRecipes(recipe=recipe, **item)
+            for ingredient_id, item in new.items()
+            if ingredient_id not in current
+        ]
+        for row in created:
+            deltas[row.ingredient.id] = row.amount
+        IngredientRecipes.objects.filter(
+            id__in=[row.id for row in updated if not row.amount]
+        ).delete()
+        IngredientRecipes.objects.bulk_update(
+            [row for row in updated if row.amount], ['amount']
+        )
+        IngredientRecipes.objects.bulk_create(created)
+        ShoppingListItem.objects.change_recipe(recipe.id, deltas)
+
     @atomic
     def update(self, instance, validated_data):
-        tags = validated_data.pop('tags')
-        ingredients = validated_data.pop('ingredients')
-        instance.tags.set(tags)
-        IngredientRecipes.objects.filter(recipe=instance).delete()
-        super().update(instance, validated_data)
-        self.create_ingredients(ingredients, instance)
-        instance.save()
-        return instance
+        """Обновить рецепт по разнице с текущим состоянием.
+
+        Не переданные при PATCH теги и ингредиенты не меняются.
+        """
+        tags = validated_data.pop('tags', None)
+        ingredients = validated_data.pop('ingredients', None)
+        if tags is not None:
+            self.update_tags(instance, tags)
+        if ingredients is not None:
+            self.update_ingredients(instance, ingredients)
+        return super().update(instance, validated_data)
 
     def to_representation(self, instance):
+        prefetch_related_objects(
+            [instance], 'amount_ingredients__ingredient', 'tags'
+        )
         request = self.context.get('request')
         context = {'request': request}
         return RecipeReadSerializer(instance,
@@ -188,18 +284,49 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
 
 class RecipeFavoriteSerializer(serializers.ModelSerializer):
     """Сериализатор работает с моделью Recipe."""
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = Recipe
         fields = (
             'id',
             'name',
             'image',
+            'image_variants',
             'cooking_time'
         )
 
 
-class RecipeRelationModeSerializer(serializers.ModelSerializer):
+class UserRelationSerializer(serializers.ModelSerializer):
+    """Базовый сериализатор связи пользователя с рецептом или автором.
+
+    Связи передаются по id, без выборки объектов. Связь создается
+    одним INSERT в точке сохранения: повтор, в том числе параллельный,
+    упирается в уникальное ограничение модели и дает ошибку валидации.
+    Остальные ошибки целостности, в том числе из обработчиков
+    post_save, пробрасываются как есть.
+    """
+    user = serializers.IntegerField(source='user_id')
+    duplicate_message = None
+
+    def create(self, validated_data):
+        try:
+            with atomic():
+                return super().create(validated_data)
+        except IntegrityError:
+            if not self.Meta.model.objects.filter(
+                **validated_data
+            ).exists():
+                raise
+            raise serializers.ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [self.duplicate_message]}
+            )
+
+
+class RecipeRelationModeSerializer(UserRelationSerializer):
     """Базовый абстрактынй сериалайзер для моделей Favorite и ShoppingCart."""
+    recipe = serializers.IntegerField(source='recipe_id')
+
     class Meta:
         model = Favorite
         abstract = True
@@ -208,15 +335,12 @@ class RecipeRelationModeSerializer(serializers.ModelSerializer):
             'recipe'
         )
 
-    def validate(self, data):
-        user = data['user']
-        recipe = data['recipe']
-        if self.Meta.model.objects.filter(user=user, recipe=recipe).exists():
-            raise serializers.ValidationError(
-                f'Вы уже добавили рецепт в - '
-                f'{self.Meta.model._meta.verbose_name_plural}'
-            )
-        return data
+    @property
+    def duplicate_message(self):
+        return (
+            f'Вы уже добавили рецепт в - '
+            f'{self.Meta.model._meta.verbose_name_plural}'
+        )
 
 
 class FavoriteSerializer(RecipeRelationModeSerializer):
@@ -231,35 +355,55 @@ class ShoppingCartSerializer(RecipeRelationModeSerializer):
         model = ShoppingCart
 
 
-class SubscriptionSerializer(serializers.ModelSerializer):
+class RecipeIdsSerializer(serializers.Serializer):
+    """Список id рецептов для массового изменения избранного и корзины."""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_BULK_IDS,
+    )
+
+    def validate_ids(self, value):
+        return list(dict.fromkeys(value))
+
+
+class SubscriptionSerializer(UserRelationSerializer):
     """Сериализатор работает с моделью Subscription."""
+    author = serializers.IntegerField(source='author_id')
+    duplicate_message = 'Дважды на одного пользователя нельзя подписаться'
+
     class Meta:
         model = Subscription
         fields = (
             'user',
             'author'
         )
-        validators = [
-            UniqueTogetherValidator(
-                queryset=Subscription.objects.all(),
-                fields=['user', 'author'],
-                message='Дважды на одного пользователя нельзя подписаться'
-            )
-        ]
 
     def validate(self, data):
-        if data['author'] == data['user']:
+        if data['author_id'] == data['user_id']:
             raise serializers.ValidationError('Нельзя подписаться на себя')
         return data
 
 
 class SubscriptionReadSerializer(UserSerializer):
-    """Сериализатор для модели User."""
-    recipes = RecipeFavoriteSerializer(many=True, read_only=True)
-    recipes_count = SerializerMethodField(read_only=True)
+    """Сериализатор для модели User.
+
+    Берет рецепты из recent_recipes, если queryset их подготовил,
+    иначе запрашивает их сам.
+    """
+    recipes = SerializerMethodField(read_only=True)
+    recipes_count = serializers.IntegerField(read_only=True)
 
     class Meta(UserSerializer.Meta):
         fields = UserSerializer.Meta.fields + ('recipes', 'recipes_count')
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
+    def get_recipes(self, obj):
+        recipes = getattr(obj, 'recent_recipes', None)
+        if recipes is None:
+            recipes = obj.recipes.all()
+            recipes_limit = get_recipes_limit(self.context['request'])
+            if recipes_limit is not None:
+                recipes = recipes[:recipes_limit]
+        return RecipeFavoriteSerializer(
+            recipes, many=True, context=self.context
+        ).data
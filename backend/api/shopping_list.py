@@ -0,0 +1,86 @@
+import csv
+import json
+
+from django.db.models import F
+from django.http import StreamingHttpResponse
+
+from recipes.models import ShoppingListItem
+
+
+SHOPPING_LIST_FILENAME = 'shopping_list'
+
+
+def get_shopping_list(user):
+    """Список покупок пользователя из материализованной таблицы.
+
+    Суммы ингредиентов по корзине поддерживаются при ее изменении,
+    поэтому здесь нужен только проход по строкам пользователя.
+    """
+    return ShoppingListItem.objects.filter(
+        user=user
+    ).values(
+        'ingredient_id',
+        name=F('ingredient__name'),
+        measurement_unit=F('ingredient__measurement_unit'),
+        total=F('amount'),
+    ).order_by('name')
+
+
+class Echo:
+    """Псевдо-буфер для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def stream_txt(items):
+    yield 'Список покупок:\n'
+    for item in items:
+        yield '{name} ({measurement_unit}) - {total}\n'.format(**item)
+
+
+def stream_csv(items):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'measurement_unit', 'amount'))
+    for item in items:
+        yield writer.writerow(
+            (item['name'], item['measurement_unit'], item['total'])
+        )
+
+
+def stream_json(items):
+    separator = ''
+    yield '['
+    for item in items:
+        yield separator + json.dumps(
+            {
+                'id': item['ingredient_id'],
+                'name': item['name'],
+                'measurement_unit': item['measurement_unit'],
+                'amount': item['total'],
+            },
+            ensure_ascii=False,
+        )
+        separator = ','
+    yield ']'
+
+
+SHOPPING_LIST_FORMATS = {
+    'txt': (stream_txt, 'text/plain'),
+    'csv': (stream_csv, 'text/csv'),
+    'json': (stream_json, 'application/json'),
+}
+
+
+def shopping_list_response(user, file_format='txt'):
+    """Отдать список покупок потоком в выбранном формате."""
+    stream, content_type = SHOPPING_LIST_FORMATS[file_format]
+    items = get_shopping_list(user).iterator()
+    response = StreamingHttpResponse(
+        stream(items),
+        content_type=f'{content_type}; charset=utf-8',
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{SHOPPING_LIST_FILENAME}.{file_format}"'
+    )
+    return response
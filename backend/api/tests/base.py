@@ -0,0 +1,47 @@
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+
+class APITestCase(TestCase):
+    """Тесты API с локальным кешем и временным каталогом медиа.
+
+    Кеш очищается перед каждым тестом; копии изображений собираются
+    после коммита, поэтому внутри TestCase не строятся.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp(prefix='api-tests-')
+        cls.test_settings = override_settings(
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'api-tests',
+            }},
+            MEDIA_ROOT=cls.media_root,
+            IMAGE_PIPELINE_WORKERS=0,
+        )
+        cls.test_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.test_settings.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def get_with_queries(self, path, cold=True):
+        """Ответ на GET и число запросов к базе за него."""
+        if cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response, len(queries)
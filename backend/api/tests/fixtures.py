@@ -0,0 +1,109 @@
+"""Данные для тестов API."""
+import io
+from base64 import b64encode
+
+from django.core.files.base import ContentFile
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    IngredientRecipes,
+    Recipe,
+    ShoppingCart,
+    Tag,
+)
+from users.models import Subscription, User
+
+
+PASSWORD = 'budget-Password-42'
+RECIPES_PER_AUTHOR = 8
+INGREDIENTS_PER_RECIPE = 4
+
+
+def make_image():
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8), 'orange').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def create_recipes(author, tags, ingredients, image):
+    recipes = []
+    for number in range(RECIPES_PER_AUTHOR):
+        recipe = Recipe.objects.create(
+            author=author,
+            name=f'{author.username} {number}',
+            image=ContentFile(image, 'recipe.png'),
+            text='Описание',
+            cooking_time=10 + number,
+        )
+        recipe.tags.set(tags[number % 2:number % 2 + 2])
+        IngredientRecipes.objects.bulk_create(
+            IngredientRecipes(
+                recipe=recipe,
+                ingredient=ingredients[(number + shift) % len(ingredients)],
+                amount=10 * (shift + 1),
+            )
+            for shift in range(INGREDIENTS_PER_RECIPE)
+        )
+        recipes.append(recipe)
+    return recipes
+
+
+def create_user(username):
+    user = User(
+        username=username,
+        email=f'{username}@example.com',
+        first_name=username,
+        last_name=username,
+    )
+    user.set_password(PASSWORD)
+    user.save()
+    return user
+
+
+def build_fixture():
+    """Создать данные, на которых считаются бюджеты запросов.
+
+    Читатель подписан на автора, часть рецептов автора у него
+    в избранном и в корзине, свои рецепты есть у обоих.
+    """
+    author = create_user('author')
+    reader = create_user('reader')
+    other = create_user('other')
+    tags = [
+        Tag.objects.create(name=name, color=color, slug=name)
+        for name, color in (
+            ('breakfast', '#E26C2D'),
+            ('lunch', '#49B64E'),
+            ('dinner', '#8775D2'),
+        )
+    ]
+    ingredients = [
+        Ingredient.objects.create(name=name, measurement_unit='г')
+        for name in (
+            'молоко', 'мука', 'яйца', 'масло', 'сахар', 'соль',
+            'перец', 'рис', 'гречка', 'творог',
+        )
+    ]
+    image = make_image()
+    recipes = create_recipes(author, tags, ingredients, image)
+    own = create_recipes(reader, tags, ingredients, image)
+    Subscription.objects.create(user=reader, author=author)
+    for recipe in recipes[:3]:
+        Favorite.objects.create(user=reader, recipe=recipe)
+        ShoppingCart.objects.create(user=reader, recipe=recipe)
+    return {
+        'author': author,
+        'reader': reader,
+        'other': other,
+        'token': Token.objects.create(user=reader).key,
+        'tags': tags,
+        'ingredients': ingredients,
+        'image': 'data:image/png;base64,' + b64encode(image).decode(),
+        'linked': recipes[0],
+        'recipe': recipes[-1],
+        'own': own[0],
+        'recipes': recipes,
+    }
@@ -0,0 +1,52 @@
+from django.core.cache import cache
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.authentication import get_token_cache_key
+from api.tests.base import APITestCase
+from api.tests.fixtures import PASSWORD, create_user
+from users.models import Subscription, User
+
+
+class CachedTokenTest(APITestCase):
+    """Снимок пользователя в кеше токенов.
+
+    В снимке нет хеша пароля и счетчиков, а запись через пользователя
+    из снимка не затирает счетчики, измененные в обход save().
+    """
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_user('reader')
+        cls.follower = create_user('follower')
+        cls.token = Token.objects.create(user=cls.reader).key
+
+    def setUp(self):
+        super().setUp()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+
+    def get_me(self):
+        response = self.client.get('/api/users/me/')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_snapshot_has_no_secrets(self):
+        self.get_me()
+        snapshot = cache.get(get_token_cache_key(self.token))
+        self.assertEqual(snapshot['id'], self.reader.id)
+        self.assertNotIn('password', snapshot)
+        self.assertNotIn('followers_count', snapshot)
+        self.assertEqual(self.get_me()['email'], self.reader.email)
+
+    def test_set_password_keeps_counters(self):
+        self.get_me()
+        Subscription.objects.create(user=self.follower, author=self.reader)
+        response = self.client.post('/api/users/set_password/', {
+            'current_password': PASSWORD,
+            'new_password': 'N3w-Passw0rd!',
+        }, format='json')
+        self.assertEqual(response.status_code, 204, response.content)
+        reader = User.objects.get(pk=self.reader.pk)
+        self.assertEqual(reader.followers_count, 1)
+        self.assertTrue(reader.check_password('N3w-Passw0rd!'))
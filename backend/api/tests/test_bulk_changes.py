@@ -0,0 +1,131 @@
+from unittest import mock
+
+from rest_framework.test import APIClient
+
+from api.tests.base import APITestCase
+from api.tests.fixtures import build_fixture
+from recipes.models import (
+    Favorite,
+    Recipe,
+    RecipeRelationManager,
+    ShoppingCart,
+    ShoppingListItem,
+)
+
+
+MISSING_ID = 10 ** 9
+
+MODELS = (
+    ('favorite', Favorite, 'favorites_count'),
+    ('shopping_cart', ShoppingCart, 'shopping_cart_count'),
+)
+
+
+class BulkChangeTest(APITestCase):
+    """Сводка массового изменения избранного и корзины.
+
+    В запросе есть рецепты уже в списке, новые, повторы и
+    несуществующие id; после запроса сверяются связи, счетчики
+    рецептов и материализованный список покупок.
+    """
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = build_fixture()
+
+    def setUp(self):
+        super().setUp()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {self.data["token"]}'
+        )
+        recipes = self.data['recipes']
+        self.linked, self.new, self.other = recipes[0], recipes[4], recipes[5]
+        self.absent = recipes[7]
+
+    def get_counters(self, field):
+        return dict(Recipe.objects.values_list('id', field))
+
+    def bulk(self, method, url, ids):
+        response = getattr(self.client, method)(
+            f'/api/recipes/{url}/bulk/', {'ids': ids}, format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def assert_state(self, model, field, counters, linked, deltas):
+        self.assertEqual(
+            set(model.objects.filter(
+                user=self.data['reader']
+            ).values_list('recipe_id', flat=True)),
+            linked,
+        )
+        expected = dict(counters)
+        for pk, delta in deltas.items():
+            expected[pk] += delta
+        self.assertEqual(self.get_counters(field), expected)
+        self.assertEqual(
+            {
+                (item.user_id, item.ingredient_id): item.amount
+                for item in ShoppingListItem.objects.all()
+            },
+            ShoppingListItem.objects.compute_totals(),
+        )
+
+    def test_add_and_remove(self):
+        for url, model, field in MODELS:
+            with self.subTest(url=url):
+                before = set(model.objects.filter(
+                    user=self.data['reader']
+                ).values_list('recipe_id', flat=True))
+                counters = self.get_counters(field)
+                self.assertEqual(self.bulk('post', url, [
+                    self.linked.id, self.new.id, self.new.id, MISSING_ID,
+                    self.other.id,
+                ]), {
+                    'added': [self.new.id, self.other.id],
+                    'exists': [self.linked.id],
+                    'not_found': [MISSING_ID],
+                })
+                added = {self.new.id, self.other.id}
+                self.assert_state(
+                    model, field, counters, before | added,
+                    {pk: 1 for pk in added},
+                )
+                self.assertEqual(self.bulk('delete', url, [
+                    self.linked.id, self.new.id, MISSING_ID, self.absent.id,
+                    self.linked.id,
+                ]), {
+                    'removed': [self.linked.id, self.new.id],
+                    'absent': [self.absent.id],
+                    'not_found': [MISSING_ID],
+                })
+                self.assert_state(
+                    model, field, counters,
+                    before - {self.linked.id} | {self.other.id},
+                    {self.linked.id: -1, self.other.id: 1},
+                )
+
+    def test_concurrent_add_is_not_counted_twice(self):
+        """Связь, вставленная после выборки, попадает в exists."""
+        get_existing = RecipeRelationManager.get_existing
+
+        def insert_concurrently(manager, recipe_ids):
+            existing = get_existing(manager, recipe_ids)
+            manager.create(user=self.data['reader'], recipe=self.new)
+            return existing
+
+        for url, model, field in MODELS:
+            with self.subTest(url=url):
+                counters = self.get_counters(field)
+                with mock.patch.object(
+                    RecipeRelationManager, 'get_existing',
+                    autospec=True, side_effect=insert_concurrently,
+                ):
+                    summary = self.bulk('post', url, [self.new.id])
+                self.assertEqual(summary['added'], [])
+                self.assertEqual(summary['exists'], [self.new.id])
+                self.assertEqual(
+                    self.get_counters(field)[self.new.id],
+                    counters[self.new.id] + 1,
+                )
@@ -0,0 +1,59 @@
+from django.test import TestCase
+
+from recipes.models import Ingredient, IngredientTrigram
+from recipes.utils import get_trigrams
+
+
+def similarity(name, query):
+    trigrams, query_trigrams = get_trigrams(name), get_trigrams(query)
+    common = len(trigrams & query_trigrams)
+    return common / (len(trigrams) + len(query_trigrams) - common)
+
+
+class TrigramSearchTest(TestCase):
+    """Нечеткий поиск совпадает с перебором всех названий.
+
+    Длинные названия делят с запросом больше триграмм, чем лучшие
+    совпадения, но их сходство ниже.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        names = [
+            f'сахарная пудра с ванильным ароматом номер {number} '
+            f'для выпечки тортов'
+            for number in range(12)
+        ]
+        names += [
+            'ванильная пудра', 'сахарная пудра', 'сахар', 'пудра', 'соль',
+        ]
+        for name in names:
+            Ingredient.objects.create(name=name, measurement_unit='г')
+
+    def reference(self, query, limit):
+        ranked = sorted(
+            (
+                (-similarity(ingredient.name, query), ingredient.name)
+                for ingredient in Ingredient.objects.all()
+                if similarity(ingredient.name, query)
+                >= IngredientTrigram.objects.similarity_threshold
+            )
+        )
+        return [name for _, name in ranked[:limit]]
+
+    def test_matches_full_scan(self):
+        for query, limit in (
+            ('сахарная пудра ванильная', 1),
+            ('сахарная пудра ванильная', 3),
+            ('сахарная пудра', 20),
+            ('сахр', 5),
+            ('перец', 5),
+        ):
+            with self.subTest(query=query, limit=limit):
+                self.assertEqual(
+                    [
+                        ingredient.name for ingredient
+                        in IngredientTrigram.objects.search(query, limit)
+                    ],
+                    self.reference(query, limit),
+                )
@@ -0,0 +1,54 @@
+from unittest import mock
+
+from django.core.files.base import ContentFile
+
+from api.tests.base import APITestCase
+from api.tests.fixtures import create_user, make_image
+from core import memberships
+from recipes.models import Favorite, Recipe
+
+
+class MembershipsCacheTest(APITestCase):
+    """Закешированные id не переживают изменение, закоммиченное
+    между чтением из базы и записью в кеш.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_user('reader')
+        cls.recipe = Recipe.objects.create(
+            author=create_user('author'),
+            name='Рецепт',
+            image=ContentFile(make_image(), 'recipe.png'),
+            text='Описание',
+            cooking_time=10,
+        )
+
+    def test_stale_load_is_not_reused(self):
+        load = memberships.load_memberships
+
+        def load_then_change(user_id):
+            data = load(user_id)
+            with self.captureOnCommitCallbacks(execute=True):
+                Favorite.objects.create(user=self.reader, recipe=self.recipe)
+            return data
+
+        with mock.patch.object(
+            memberships, 'load_memberships', side_effect=load_then_change
+        ):
+            stale = memberships.get_memberships(self.reader.id)
+        self.assertNotIn(self.recipe.id, stale.favorites)
+        self.assertIn(
+            self.recipe.id,
+            memberships.get_memberships(self.reader.id).favorites,
+        )
+
+    def test_cached_until_change(self):
+        memberships.get_memberships(self.reader.id)
+        with self.assertNumQueries(0):
+            memberships.get_memberships(self.reader.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            Favorite.objects.create(user=self.reader, recipe=self.recipe)
+        with self.assertNumQueries(1):
+            cached = memberships.get_memberships(self.reader.id)
+        self.assertIn(self.recipe.id, cached.favorites)
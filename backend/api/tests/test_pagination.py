@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta, timezone
+
+from rest_framework.test import APIClient
+
+from api.tests.base import APITestCase
+from api.tests.fixtures import RECIPES_PER_AUTHOR, build_fixture
+from recipes.models import Recipe
+
+
+PAGE_SIZE = 3
+
+
+class RecipeCursorPaginationTest(APITestCase):
+    """Keyset-пагинация ленты по (pub_date, id).
+
+    Рецепты публикуются группами с одинаковым pub_date, поэтому
+    границы страниц проходят и внутри групп.
+    """
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        build_fixture()
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        for number, pk in enumerate(
+            Recipe.objects.order_by('id').values_list('id', flat=True)
+        ):
+            Recipe.objects.filter(pk=pk).update(
+                pub_date=start + timedelta(days=number // 4)
+            )
+        cls.expected = list(Recipe.objects.order_by(
+            '-pub_date', '-id'
+        ).values_list('id', flat=True))
+
+    def get_page(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        data = response.json()
+        return data, [recipe['id'] for recipe in data['results']]
+
+    def walk_forward(self):
+        url = f'/api/recipes/?pagination=cursor&limit={PAGE_SIZE}'
+        pages = []
+        while url:
+            data, ids = self.get_page(url)
+            self.assertEqual(data['previous'] is None, not pages)
+            pages.append((data, ids))
+            url = data['next']
+        return pages
+
+    def test_forward(self):
+        pages = self.walk_forward()
+        self.assertEqual(len(self.expected), 2 * RECIPES_PER_AUTHOR)
+        self.assertEqual(
+            [pk for _, ids in pages for pk in ids], self.expected
+        )
+        self.assertTrue(all(len(ids) <= PAGE_SIZE for _, ids in pages))
+
+    def test_backward(self):
+        pages = self.walk_forward()
+        backward = [pages[-1][1]]
+        url = pages[-1][0]['previous']
+        while url:
+            data, ids = self.get_page(url)
+            self.assertIsNotNone(data['next'])
+            backward.append(ids)
+            url = data['previous']
+        self.assertEqual(backward[::-1], [ids for _, ids in pages])
+
+    def test_invalid_cursor(self):
+        for cursor in ('bad', 'cD0xJmk9Mg==', 'aT0x'):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(
+                    f'/api/recipes/?pagination=cursor&cursor={cursor}'
+                )
+                self.assertEqual(response.status_code, 404)
@@ -0,0 +1,55 @@
+from urllib.parse import urlencode
+
+from django.test import override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.tests.base import APITestCase
+from api.tests.fixtures import create_user
+from recipes.models import Recipe
+
+
+@override_settings(REQUEST_BODY_MAX_BYTES=1024)
+class RequestBodyLimitTest(APITestCase):
+    """Тело больше REQUEST_BODY_MAX_BYTES отклоняется до разбора."""
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.token = Token.objects.create(user=create_user('reader')).key
+
+    def setUp(self):
+        super().setUp()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+
+    def post(self, text, **kwargs):
+        return self.client.post('/api/recipes/', {
+            'name': 'Рецепт',
+            'text': text,
+            'cooking_time': 10,
+            'image': 'data:image/png;base64,' + 'A' * 4,
+            'tags': [],
+            'ingredients': [],
+        }, **kwargs)
+
+    def test_json(self):
+        response = self.post('x' * 2048, format='json')
+        self.assertEqual(response.status_code, 413, response.content)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_multipart(self):
+        response = self.post('x' * 2048)
+        self.assertEqual(response.status_code, 413, response.content)
+
+    def test_form(self):
+        response = self.client.post(
+            '/api/recipes/',
+            urlencode({'name': 'Рецепт', 'text': 'x' * 2048}),
+            content_type='application/x-www-form-urlencoded',
+        )
+        self.assertEqual(response.status_code, 413, response.content)
+
+    def test_small_body_is_parsed(self):
+        response = self.post('x', format='json')
+        self.assertEqual(response.status_code, 400, response.content)
+        self.assertIn('image', response.json())
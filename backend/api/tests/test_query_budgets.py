@@ -0,0 +1,227 @@
+"""Бюджеты SQL-запросов для маршрутов api.urls.
+
+Каждый случай задает маршрут, метод и допустимое число запросов
+для анонимного и авторизованного пользователя на данных из
+build_fixture.
+"""
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.transaction import atomic, set_rollback
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, reverse
+from django.urls.resolvers import URLResolver
+from rest_framework.test import APIClient
+
+from api.tests.base import APITestCase
+from api.tests.fixtures import INGREDIENTS_PER_RECIPE, PASSWORD, build_fixture
+from core.queries import get_fingerprint
+
+
+@dataclass
+class Case:
+    """Запрос к маршруту и бюджеты (аноним, авторизованный).
+
+    С warm бюджет считается для повторного запроса на прогретом кеше.
+    """
+    name: str
+    method: str
+    budgets: Tuple[int, int]
+    kwargs: Callable = lambda data: {}
+    query: str = ''
+    body: Optional[Callable] = None
+    warm: bool = False
+
+
+def get_route_names(patterns, namespace='api', current=None):
+    """Имена маршрутов пространства имен, до которых доходит запрос.
+
+    Варианты с суффиксом формата и маршруты, перекрытые более ранними
+    с тем же шаблоном, пропускаются.
+    """
+    seen = {}
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            nested = get_route_names(
+                pattern.url_patterns,
+                namespace,
+                pattern.namespace or current,
+            )
+            for route, name in nested.items():
+                seen.setdefault(str(pattern.pattern) + route, name)
+            continue
+        route = str(pattern.pattern)
+        if current == namespace and '(?P<format>' not in route:
+            seen.setdefault(route, pattern.name)
+    return seen
+
+
+def recipe_body(data):
+    return {
+        'name': 'Новый рецепт',
+        'text': 'Описание',
+        'cooking_time': 15,
+        'image': data['image'],
+        'tags': [tag.id for tag in data['tags'][:2]],
+        'ingredients': [
+            {'id': ingredient.id, 'amount': 5}
+            for ingredient in data['ingredients'][:INGREDIENTS_PER_RECIPE]
+        ],
+    }
+
+
+def recipe_ids(data):
+    return {'ids': [recipe.id for recipe in data['recipes']]}
+
+
+def recipe_pk(name):
+    return lambda data: {'pk': data[name].pk}
+
+
+def user_id(name):
+    return lambda data: {'id': data[name].pk}
+
+
+CASES = (
+    Case('api-root', 'get', (0, 1)),
+    Case('recipe-list', 'get', (7, 9)),
+    Case('recipe-list', 'get', (1, 1), warm=True),
+    Case('recipe-list', 'get', (9, 11),
+         query='?tags=breakfast&tags=lunch&author=1'),
+    Case('recipe-list', 'get', (0, 9),
+         query='?is_favorited=1&is_in_shopping_cart=1'),
+    Case('recipe-list', 'get', (6, 8), query='?pagination=cursor'),
+    Case('recipe-list', 'get', (1, 1), query='?pagination=cursor',
+         warm=True),
+    Case('recipe-list', 'post', (0, 16), body=recipe_body),
+    Case('recipe-detail', 'get', (5, 7), kwargs=recipe_pk('recipe')),
+    Case('recipe-detail', 'get', (0, 0), kwargs=recipe_pk('recipe'),
+         warm=True),
+    Case('recipe-detail', 'patch', (0, 19), kwargs=recipe_pk('own'),
+         body=recipe_body),
+    Case('recipe-detail', 'delete', (0, 11), kwargs=recipe_pk('own')),
+    Case('recipe-favorite', 'post', (0, 6), kwargs=recipe_pk('recipe')),
+    Case('recipe-favorite', 'delete', (0, 5), kwargs=recipe_pk('linked')),
+    Case('recipe-shopping-cart', 'post', (0, 13),
+         kwargs=recipe_pk('recipe')),
+    Case('recipe-shopping-cart', 'delete', (0, 12),
+         kwargs=recipe_pk('linked')),
+    Case('recipe-favorite-bulk', 'post', (0, 6), body=recipe_ids),
+    Case('recipe-favorite-bulk', 'delete', (0, 6), body=recipe_ids),
+    Case('recipe-shopping-cart-bulk', 'post', (0, 13), body=recipe_ids),
+    Case('recipe-shopping-cart-bulk', 'delete', (0, 12), body=recipe_ids),
+    Case('recipe-download-shopping-cart', 'get', (0, 2)),
+    Case('tag-list', 'get', (1, 2)),
+    Case('tag-detail', 'get', (1, 2),
+         kwargs=lambda data: {'pk': data['tags'][0].pk}),
+    Case('ingredient-list', 'get', (1, 2)),
+    Case('ingredient-list', 'get', (1, 2), query='?name=му'),
+    Case('ingredient-list', 'get', (2, 3), query='?name=мка&fuzzy=1'),
+    Case('ingredient-detail', 'get', (1, 2),
+         kwargs=lambda data: {'pk': data['ingredients'][0].pk}),
+    Case('ingredient-changes', 'get', (2, 3), query='?since=0'),
+    Case('users-list', 'get', (2, 4)),
+    Case('users-list', 'post', (5, 6), body=lambda data: {
+        'email': 'new@example.com',
+        'username': 'new',
+        'first_name': 'Новый',
+        'last_name': 'Пользователь',
+        'password': PASSWORD,
+    }),
+    Case('users-detail', 'get', (0, 3), kwargs=user_id('author')),
+    Case('users-me', 'get', (0, 2)),
+    Case('users-subscriptions', 'get', (0, 5), query='?recipes_limit=3'),
+    Case('users-subscribe', 'post', (0, 8), kwargs=user_id('other')),
+    Case('users-subscribe', 'delete', (0, 5), kwargs=user_id('author')),
+    Case('users-set-password', 'post', (0, 3), body=lambda data: {
+        'current_password': PASSWORD,
+        'new_password': PASSWORD + '-new',
+    }),
+    Case('users-set-username', 'post', (0, 4), body=lambda data: {
+        'current_password': PASSWORD,
+        'new_email': 'reader-new@example.com',
+    }),
+    Case('users-activation', 'post', (0, 1),
+         body=lambda data: {'uid': 'x', 'token': 'x'}),
+    Case('users-resend-activation', 'post', (1, 2),
+         body=lambda data: {'email': 'nobody@example.com'}),
+    Case('users-reset-password', 'post', (1, 2),
+         body=lambda data: {'email': 'nobody@example.com'}),
+    Case('users-reset-password-confirm', 'post', (0, 1),
+         body=lambda data: {'uid': 'x', 'token': 'x', 'new_password': 'x'}),
+    Case('users-reset-username', 'post', (1, 2),
+         body=lambda data: {'email': 'nobody@example.com'}),
+    Case('users-reset-username-confirm', 'post', (1, 2),
+         body=lambda data: {'uid': 'x', 'token': 'x', 'new_email': 'x'}),
+    Case('login', 'post', (3, 4), body=lambda data: {
+        'email': data['reader'].email,
+        'password': PASSWORD,
+    }),
+    Case('logout', 'post', (0, 3)),
+)
+
+
+class QueryBudgetsTest(APITestCase):
+    """Маршруты API укладываются в свои бюджеты запросов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = build_fixture()
+
+    def get_clients(self):
+        anonymous, authenticated = APIClient(), APIClient()
+        authenticated.credentials(
+            HTTP_AUTHORIZATION=f'Token {self.data["token"]}'
+        )
+        for client in (anonymous, authenticated):
+            client.raise_request_exception = False
+        return (('anonymous', anonymous), ('authenticated', authenticated))
+
+    def run_case(self, case, client):
+        """Выполнить запрос и откатить его изменения.
+
+        Кеш очищается перед каждым запросом, поэтому бюджет считается
+        для холодного кеша; для warm кеш прогревается тем же запросом.
+        """
+        path = reverse(f'api:{case.name}', kwargs=case.kwargs(self.data))
+        path += case.query
+        body = case.body(self.data) if case.body else None
+        with atomic():
+            cache.clear()
+            if case.warm:
+                getattr(client, case.method)(path, body, format='json')
+            with CaptureQueriesContext(connection) as queries:
+                response = getattr(client, case.method)(
+                    path, body, format='json'
+                )
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            set_rollback(True)
+        return response, queries.captured_queries
+
+    def test_budgets(self):
+        clients = self.get_clients()
+        for case in CASES:
+            for (role, client), budget in zip(clients, case.budgets):
+                with self.subTest(
+                    case.name, method=case.method, query=case.query,
+                    role=role, warm=case.warm,
+                ):
+                    response, queries = self.run_case(case, client)
+                    self.assertLess(response.status_code, 500)
+                    self.assertLessEqual(
+                        len(queries), budget, format_queries(queries)
+                    )
+
+    def test_all_routes_have_budgets(self):
+        required = set(get_route_names(get_resolver().url_patterns).values())
+        self.assertEqual(required - {case.name for case in CASES}, set())
+
+
+def format_queries(queries):
+    """Список запросов для сообщения о превышении бюджета."""
+    return '\n'.join(
+        get_fingerprint(query['sql']) for query in queries
+    )
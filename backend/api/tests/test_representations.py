@@ -0,0 +1,102 @@
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.renderers import JSONRenderer
+
+from api.management.commands.benchmark_serializers import Command, render
+from api.renderers import FastJSONRenderer
+from api.representations import FastRecipeReadSerializer, recipe_cache
+from api.serializers import RecipeReadSerializer
+from api.tests.base import APITestCase
+from api.tests.fixtures import build_fixture
+from users.models import User
+
+
+class FastRepresentationTest(APITestCase):
+    """Быстрое чтение рецептов совпадает с RecipeReadSerializer побайтно.
+
+    Часть рецептов фикстуры в избранном и корзине читателя, автор
+    в его подписках; у одного рецепта есть копии изображения и текст
+    с кавычками и разделителями строк U+2028 и U+2029.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = build_fixture()
+        recipe = cls.data['recipe']
+        recipe.image_variants = {
+            'source': recipe.image.name,
+            'sizes': {
+                '320': {'webp': 'recipes/a.webp', 'jpeg': 'recipes/a.jpg'},
+            },
+        }
+        recipe.text = 'Строка "в кавычках"\u2028и\u2029дальше\n</script>'
+        recipe.save(update_fields=['image_variants', 'text'])
+
+    def get_users(self):
+        return (
+            ('anonymous', AnonymousUser()),
+            ('authenticated', self.data['reader']),
+        )
+
+    def get_reference(self, request):
+        recipes = Command.get_recipes(request, None)
+        self.assertGreater(len(recipes), 1)
+        return recipes, render(
+            RecipeReadSerializer, JSONRenderer, recipes, request
+        )
+
+    def test_fast_serializer(self):
+        for role, user in self.get_users():
+            with self.subTest(role=role):
+                request = Command.get_request(user)
+                recipes, reference = self.get_reference(request)
+                self.assertEqual(
+                    b'"is_favorited":true' in reference,
+                    user.is_authenticated,
+                )
+                self.assertIn(b'"image_variants":{', reference)
+                self.assertEqual(
+                    render(
+                        FastRecipeReadSerializer, FastJSONRenderer,
+                        recipes, request,
+                    ).decode(),
+                    reference.decode(),
+                )
+
+    def test_representation_cache(self):
+        for role, user in self.get_users():
+            with self.subTest(role=role):
+                request = Command.get_request(user)
+                recipes, reference = self.get_reference(request)
+                recipe_ids = [recipe.id for recipe in recipes]
+                for attempt in ('cold', 'warm'):
+                    with self.subTest(attempt=attempt):
+                        self.assertEqual(
+                            FastJSONRenderer().render(
+                                recipe_cache.represent(recipe_ids, request)
+                            ).decode(),
+                            reference.decode(),
+                        )
+
+    def test_author_change_during_load(self):
+        """Профиль, измененный во время сборки записи, не залипает в кеше."""
+        author = self.data['author']
+        recipe_id = self.data['recipe'].id
+        request = Command.get_request(AnonymousUser())
+        in_bulk = type(User.objects).in_bulk
+
+        def load_then_change(manager, *args, **kwargs):
+            authors = in_bulk(manager, *args, **kwargs)
+            author.first_name = 'Новое имя'
+            with self.captureOnCommitCallbacks(execute=True):
+                author.save()
+            return authors
+
+        with mock.patch.object(
+            type(User.objects), 'in_bulk',
+            autospec=True, side_effect=load_then_change,
+        ):
+            recipe_cache.represent([recipe_id], request)
+        [data] = recipe_cache.represent([recipe_id], request)
+        self.assertEqual(data['author']['first_name'], 'Новое имя')
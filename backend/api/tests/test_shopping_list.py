@@ -0,0 +1,84 @@
+from rest_framework.test import APIClient
+
+from api.tests.base import APITestCase
+from api.tests.fixtures import build_fixture
+from recipes.models import ShoppingCart, ShoppingListItem
+
+
+class ShoppingListTest(APITestCase):
+    """Материализованный список покупок совпадает с суммой по корзинам.
+
+    После каждого изменения корзин и рецептов таблица сверяется
+    с пересчетом compute_totals с нуля.
+    """
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = build_fixture()
+        ShoppingCart.objects.create(
+            user=cls.data['author'], recipe=cls.data['own']
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {self.data["token"]}'
+        )
+
+    def assert_materialized(self):
+        self.assertEqual(
+            {
+                (item.user_id, item.ingredient_id): item.amount
+                for item in ShoppingListItem.objects.all()
+            },
+            ShoppingListItem.objects.compute_totals(),
+        )
+
+    def request(self, method, path, body=None, status=200):
+        response = getattr(self.client, method)(path, body, format='json')
+        self.assertEqual(response.status_code, status, response.content)
+        self.assert_materialized()
+
+    def test_cart_changes(self):
+        recipes = self.data['recipes']
+        self.assert_materialized()
+        self.request(
+            'post', f'/api/recipes/{self.data["recipe"].id}/shopping_cart/',
+            status=201,
+        )
+        self.request(
+            'delete', f'/api/recipes/{self.data["linked"].id}/shopping_cart/',
+            status=204,
+        )
+        self.request(
+            'post', '/api/recipes/shopping_cart/bulk/',
+            {'ids': [recipe.id for recipe in recipes[:6]]},
+        )
+        self.request(
+            'delete', '/api/recipes/shopping_cart/bulk/',
+            {'ids': [recipe.id for recipe in recipes[2:4]]},
+        )
+
+    def test_recipe_changes(self):
+        own = self.data['own']
+        self.request(
+            'post', f'/api/recipes/{own.id}/shopping_cart/', status=201
+        )
+        ingredients = self.data['ingredients']
+        self.request('patch', f'/api/recipes/{own.id}/', {
+            'name': 'Новый рецепт',
+            'text': 'Описание',
+            'cooking_time': 15,
+            'image': self.data['image'],
+            'tags': [self.data['tags'][0].id],
+            'ingredients': [
+                {'id': ingredient.id, 'amount': 7}
+                for ingredient in ingredients[2:7]
+            ],
+        })
+        self.assertTrue(ShoppingListItem.objects.filter(
+            user=self.data['author'], ingredient=ingredients[6]
+        ).exists())
+        self.request('delete', f'/api/recipes/{own.id}/', status=204)
+        self.assertFalse(ShoppingCart.objects.filter(recipe=own).exists())
@@ -0,0 +1,87 @@
+from django.core.files.base import ContentFile
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.tests.base import APITestCase
+from api.tests.fixtures import create_user, make_image
+from recipes.models import Ingredient, IngredientRecipes, Recipe, Tag
+from users.models import Subscription
+
+
+AUTHORS = 6
+
+
+class SubscriptionStateQueriesTest(APITestCase):
+    """Признак is_subscribed не добавляет запросов на каждого автора."""
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_user('reader')
+        tag = Tag.objects.create(name='Завтрак', color='#E26C2D', slug='b')
+        ingredient = Ingredient.objects.create(
+            name='молоко', measurement_unit='мл'
+        )
+        image = make_image()
+        cls.authors = []
+        for number in range(AUTHORS):
+            author = create_user(f'author{number}')
+            recipe = Recipe.objects.create(
+                author=author,
+                name=f'Рецепт {number}',
+                image=ContentFile(image, 'recipe.png'),
+                text='Описание',
+                cooking_time=10,
+            )
+            recipe.tags.set([tag])
+            IngredientRecipes.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=100
+            )
+            cls.authors.append(author)
+        cls.followed = {author.id for author in cls.authors[::2]}
+        for author_id in cls.followed:
+            Subscription.objects.create(user=cls.reader, author_id=author_id)
+        cls.token = Token.objects.create(user=cls.reader).key
+
+    def authenticate(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+
+    def assert_constant(self, path, expected):
+        """Число запросов не зависит от размера страницы."""
+        _, small = self.get_with_queries(f'{path}?limit=2')
+        response, full = self.get_with_queries(f'{path}?limit={AUTHORS}')
+        self.assertEqual(small, full)
+        self.assertEqual(full, expected)
+        return response.json()['results']
+
+    def test_feed_anonymous(self):
+        results = self.assert_constant('/api/recipes/', 7)
+        self.assertEqual(len(results), AUTHORS)
+        self.assertFalse(any(
+            recipe['author']['is_subscribed'] for recipe in results
+        ))
+
+    def test_feed_authenticated(self):
+        self.authenticate()
+        results = self.assert_constant('/api/recipes/', 9)
+        self.assertEqual(
+            {
+                recipe['author']['id'] for recipe in results
+                if recipe['author']['is_subscribed']
+            },
+            self.followed,
+        )
+
+    def test_users_list(self):
+        self.authenticate()
+        results = self.assert_constant('/api/users/', 4)
+        for user in results:
+            self.assertEqual(
+                user['is_subscribed'], user['id'] in self.followed
+            )
+
+    def test_subscriptions(self):
+        self.authenticate()
+        results = self.assert_constant('/api/users/subscriptions/', 5)
+        self.assertEqual({user['id'] for user in results}, self.followed)
+        self.assertTrue(all(user['is_subscribed'] for user in results))
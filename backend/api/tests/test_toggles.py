@@ -0,0 +1,92 @@
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import IntegrityError
+from django.db.models.signals import post_save
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.serializers import FavoriteSerializer
+from api.tests.base import APITestCase
+from api.tests.fixtures import create_user, make_image
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscription
+
+
+class ToggleQueriesTest(APITestCase):
+    """Число запросов у переключателей избранного, корзины и подписки.
+
+    Каждый шаг выполняется с холодным кешем, в счет входят точки
+    сохранения вокруг INSERT и DELETE.
+    """
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_user('reader')
+        cls.author = create_user('author')
+        cls.recipe = Recipe.objects.create(
+            author=cls.author,
+            name='Рецепт',
+            image=ContentFile(make_image(), 'recipe.png'),
+            text='Описание',
+            cooking_time=10,
+        )
+        cls.token = Token.objects.create(user=cls.reader).key
+
+    def setUp(self):
+        super().setUp()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+
+    def assert_toggles(self, path, model, counts):
+        """Добавить, добавить повторно, убрать и убрать повторно."""
+        steps = (
+            ('post', 201, True),
+            ('post', 400, True),
+            ('delete', 204, False),
+            ('delete', 404, False),
+        )
+        for (method, status, linked), queries in zip(steps, counts):
+            with self.subTest(method=method, status=status):
+                cache.clear()
+                with self.assertNumQueries(queries):
+                    response = getattr(self.client, method)(path)
+                self.assertEqual(
+                    response.status_code, status, response.content
+                )
+                self.assertEqual(
+                    model.objects.filter(user=self.reader).exists(), linked
+                )
+
+    def test_favorite(self):
+        self.assert_toggles(
+            f'/api/recipes/{self.recipe.id}/favorite/',
+            Favorite,
+            (6, 7, 5, 4),
+        )
+
+    def test_shopping_cart(self):
+        self.assert_toggles(
+            f'/api/recipes/{self.recipe.id}/shopping_cart/',
+            ShoppingCart,
+            (9, 7, 8, 4),
+        )
+
+    def test_subscribe(self):
+        self.assert_toggles(
+            f'/api/users/{self.author.id}/subscribe/',
+            Subscription,
+            (8, 7, 5, 4),
+        )
+
+    def test_other_integrity_error_is_not_duplicate(self):
+        def fail(**kwargs):
+            raise IntegrityError('post_save')
+
+        post_save.connect(fail, sender=Favorite)
+        self.addCleanup(post_save.disconnect, fail, sender=Favorite)
+        serializer = FavoriteSerializer(data={
+            'user': self.reader.id, 'recipe': self.recipe.id
+        })
+        serializer.is_valid(raise_exception=True)
+        with self.assertRaises(IntegrityError):
+            serializer.save()
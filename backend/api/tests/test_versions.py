@@ -0,0 +1,61 @@
+from django.core.files.base import ContentFile
+
+from api.tests.base import APITestCase
+from api.tests.fixtures import create_user, make_image
+from core.versions import get_version
+from recipes.models import Favorite, Recipe
+from users.models import Subscription
+
+
+class CountVersionsTest(APITestCase):
+    """Версии количеств меняются только после коммита.
+
+    Иначе конкурентный COUNT(*) до коммита закешировал бы старое
+    количество под новой версией.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_user('reader')
+        cls.author = create_user('author')
+        cls.recipe = Recipe.objects.create(
+            author=cls.author,
+            name='Рецепт',
+            image=ContentFile(make_image(), 'recipe.png'),
+            text='Описание',
+            cooking_time=10,
+        )
+
+    def assert_bumped_on_commit(self, name, change):
+        before = get_version(name)
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+            self.assertEqual(get_version(name), before)
+        self.assertGreater(get_version(name), before)
+
+    def test_favorites(self):
+        self.assert_bumped_on_commit(
+            'favorites',
+            lambda: Favorite.objects.create(
+                user=self.reader, recipe=self.recipe
+            ),
+        )
+        self.assert_bumped_on_commit(
+            'favorites',
+            lambda: Favorite.objects.remove(self.reader, self.recipe.id),
+        )
+
+    def test_subscriptions(self):
+        self.assert_bumped_on_commit(
+            'subscriptions',
+            lambda: Subscription.objects.create(
+                user=self.reader, author=self.author
+            ),
+        )
+        self.assert_bumped_on_commit(
+            'subscriptions',
+            lambda: Subscription.objects.remove(self.reader, self.author.id),
+        )
+
+    def test_recipes(self):
+        self.assert_bumped_on_commit('recipes', self.recipe.delete)
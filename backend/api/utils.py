@@ -1,24 +1,27 @@
+from django.http import Http404
 from django.shortcuts import get_object_or_404
-from django.http import FileResponse
+from rest_framework.exceptions import ValidationError
+
+from core.memberships import EMPTY_MEMBERSHIPS, get_memberships
 from recipes.models import Recipe
-from users.models import Subscription
-from rest_framework import status
 
 
 class CreateDeleteMixin:
+    """Добавление и удаление связей пользователя с рецептом или автором.
+
+    Добавление: выборка объекта для ответа и один INSERT в точке
+    сохранения, повтор дает 400. Удаление: один DELETE, отсутствие
+    связи дает 404. Сопутствующие счетчики и версии обновляются
+    фиксированным числом запросов, не зависящим от данных.
+    """
+
     @staticmethod
     def create_object(request, pk, serializer_in, serializer_out, model):
-        user = request.user.id
         obj = get_object_or_404(model, id=pk)
-
-        data_recipe = {"user": user, "recipe": obj.id}
-        data_subscribe = {"user": user, "author": obj.id}
-
-        if model is Recipe:
-            serializer = serializer_in(data=data_recipe)
-        else:
-            serializer = serializer_in(data=data_subscribe)
-
+        field = 'recipe' if model is Recipe else 'author'
+        serializer = serializer_in(
+            data={'user': request.user.id, field: obj.id}
+        )
         serializer.is_valid(raise_exception=True)
         serializer.save()
         serializer_to_response = serializer_out(
@@ -27,30 +30,58 @@ class CreateDeleteMixin:
         return serializer_to_response
 
     @staticmethod
-    def delete_object(request, pk, model_object, model_for_delete_object):
-        user = request.user
+    def delete_object(request, pk, model):
+        if not pk.isdigit() or not model.objects.remove(request.user, pk):
+            raise Http404
 
-        obj_recipe = get_object_or_404(model_object, id=pk)
-        obj_subscription = get_object_or_404(model_object, id=pk)
+    @staticmethod
+    def bulk_change_objects(request, recipe_ids, model):
+        """Добавить или убрать рецепты из списка пользователя разом.
 
-        if model_for_delete_object is Subscription:
-            object = get_object_or_404(
-                model_for_delete_object, user=user, author=obj_subscription
-            )
+        Возвращает сводку: какие id изменены, какие уже были в нужном
+        состоянии и каких рецептов не существует.
+        """
+        if request.method == 'POST':
+            linked, changed = model.objects.add_many(request.user, recipe_ids)
+            changed_key, unchanged_key = 'added', 'exists'
         else:
-            object = get_object_or_404(
-                model_for_delete_object, user=user, recipe=obj_recipe
+            linked, changed = model.objects.remove_many(
+                request.user, recipe_ids
             )
-        object.delete()
+            changed_key, unchanged_key = 'removed', 'absent'
+        changed = set(changed)
+        summary = {changed_key: [], unchanged_key: [], 'not_found': []}
+        for pk in recipe_ids:
+            if pk in changed:
+                summary[changed_key].append(pk)
+            elif pk in linked:
+                summary[unchanged_key].append(pk)
+            else:
+                summary['not_found'].append(pk)
+        return summary
 
 
-def send_message(ingredient_lst):
-    shopping_list = ['Список покупок:']
-    for ingredient in ingredient_lst:
-        shopping_list.append('{} ({}) - {}'.format(*ingredient))
+def get_user_memberships(request):
+    """Избранное, корзина и подписки пользователя запроса.
 
-    return FileResponse(
-        '\n'.join(shopping_list),
-        status=status.HTTP_200_OK,
-        content_type='text/plain',
-    )
+    Берутся из кеша один раз и запоминаются на время запроса.
+    """
+    if request is None or not request.user.is_authenticated:
+        return EMPTY_MEMBERSHIPS
+    memberships = getattr(request, '_memberships', None)
+    if memberships is None:
+        memberships = get_memberships(request.user.id)
+        request._memberships = memberships
+    return memberships
+
+
+def get_recipes_limit(request):
+    """Значение параметра ?recipes_limit= или None, если он не задан."""
+    recipes_limit = request.query_params.get('recipes_limit')
+    if recipes_limit is None:
+        return None
+    if not recipes_limit.isdigit():
+        raise ValidationError(
+            {'recipes_limit': 'Укажите неотрицательное целое число.'}
+        )
+    return int(recipes_limit)
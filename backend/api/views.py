@@ -1,24 +1,36 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Sum, Exists, OuterRef
+from django.db.models import OuterRef, Prefetch, Subquery
+from django.http import Http404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
-from rest_framework import status, viewsets, filters
+from rest_framework import status, viewsets
 from rest_framework.decorators import action
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import (
     SAFE_METHODS,
     IsAuthenticated,
     IsAuthenticatedOrReadOnly,
 )
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
+from api.catalog import CatalogSnapshot, CatalogSnapshotMixin
 from api.filters import RecipeFilter
+from api.pagination import CachedCountPagination, RecipeCursorPagination
 from api.permissions import IsAuthorOrReadOnly
+from api.renderers import (
+    FastJSONRenderer,
+    ShoppingListCSVRenderer,
+    ShoppingListTextRenderer,
+)
+from api.representations import FastRecipeReadSerializer, recipe_cache
 from api.serializers import (
     FavoriteSerializer,
     IngredientSerializer,
     RecipeFavoriteSerializer,
-    RecipeReadSerializer,
+    RecipeIdsSerializer,
     RecipeWriteSerializer,
     ShoppingCartSerializer,
     SubscriptionReadSerializer,
@@ -26,8 +38,18 @@ from api.serializers import (
     TagSerializer,
     UserSerializer,
 )
-from api.utils import send_message, CreateDeleteMixin
-from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from api.search import ingredient_index
+from api.shopping_list import shopping_list_response
+from api.utils import CreateDeleteMixin, get_recipes_limit
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    IngredientChange,
+    IngredientTrigram,
+    Recipe,
+    ShoppingCart,
+    Tag,
+)
 from users.models import Subscription
 
 
@@ -36,39 +58,56 @@ User = get_user_model()
 
 class RecipeViewSet(viewsets.ModelViewSet, CreateDeleteMixin):
     """Вьюсет для работы с рецептами."""
-    pagination_class = PageNumberPagination
     permission_classes = (IsAuthorOrReadOnly, IsAuthenticatedOrReadOnly)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    count_versions = ('recipes', 'favorites', 'shopping_cart')
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
+
+    @property
+    def pagination_class(self):
+        """Keyset-пагинация включается параметром ?pagination=cursor."""
+        params = self.request.query_params
+        if (
+            params.get('pagination') == 'cursor'
+            or RecipeCursorPagination.cursor_query_param in params
+        ):
+            return RecipeCursorPagination
+        return CachedCountPagination
 
     def get_queryset(self):
-        """Получить QuerySet с полями is_favorited и is_in_shopping_cart"""
-        recipes = Recipe.objects.prefetch_related(
+        """Рецепты с авторами, ингредиентами и тегами.
+
+        Флаги пользователя берутся из его закешированных id, а не из
+        подзапросов.
+        """
+        return Recipe.objects.select_related('author').prefetch_related(
             'amount_ingredients__ingredient', 'tags'
         )
-        if self.request.user.is_authenticated:
-            recipes = recipes.annotate(
-                is_favorited=Exists(
-                    Favorite.objects.filter(
-                        user=self.request.user,
-                        recipe_id=OuterRef('pk'),
-                    )
-                ),
-                is_in_shopping_cart=Exists(
-                    ShoppingCart.objects.filter(
-                        user=self.request.user,
-                        recipe_id=OuterRef('pk'),
-                    )
-                ),
-            ).select_related('author')
-        return recipes
+
+    def list(self, request, *args, **kwargs):
+        """Лента из кеша представлений: из базы читаются только id."""
+        queryset = self.filter_queryset(Recipe.objects.only('id', 'pub_date'))
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(
+            recipe_cache.represent([recipe.id for recipe in page], request)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = self.kwargs['pk']
+        if not pk.isdigit():
+            raise Http404
+        data = recipe_cache.represent([int(pk)], request)
+        if not data:
+            raise Http404
+        return Response(data[0])
 
     def perform_create(self, serializer):
         return serializer.save(author=self.request.user)
 
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
-            return RecipeReadSerializer
+            return FastRecipeReadSerializer
         return RecipeWriteSerializer
 
     @action(detail=True, methods=['post'])
@@ -87,7 +126,7 @@ class RecipeViewSet(viewsets.ModelViewSet, CreateDeleteMixin):
 
     @favorite.mapping.delete
     def destroy_favorite(self, request, pk):
-        self.delete_object(request, pk, Recipe, Favorite)
+        self.delete_object(request, pk, Favorite)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=True, methods=['post'])
@@ -106,36 +145,100 @@ class RecipeViewSet(viewsets.ModelViewSet, CreateDeleteMixin):
 
     @shopping_cart.mapping.delete
     def destroy_shopping_cart(self, request, pk):
-        self.delete_object(request, pk, Recipe, ShoppingCart)
+        self.delete_object(request, pk, ShoppingCart)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-    @action(detail=False, methods=['get'],
+    def bulk_change(self, request, model):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(self.bulk_change_objects(
+            request, serializer.validated_data['ids'], model
+        ))
+
+    @action(detail=False, methods=['post', 'delete'],
+            url_path='favorite/bulk',
             permission_classes=(IsAuthenticated,))
+    def favorite_bulk(self, request):
+        """Добавить или убрать из избранного рецепты из списка ids."""
+        return self.bulk_change(request, Favorite)
+
+    @action(detail=False, methods=['post', 'delete'],
+            url_path='shopping_cart/bulk',
+            permission_classes=(IsAuthenticated,))
+    def shopping_cart_bulk(self, request):
+        """Добавить или убрать из корзины рецепты из списка ids."""
+        return self.bulk_change(request, ShoppingCart)
+
+    @action(detail=False, methods=['get'],
+            permission_classes=(IsAuthenticated,),
+            renderer_classes=(ShoppingListTextRenderer,
+                              ShoppingListCSVRenderer,
+                              JSONRenderer))
     def download_shopping_cart(self, request):
-        ingredient_lst = ShoppingCart.objects.filter(
-            user=request.user
-        ).values_list(
-            'recipe_id__ingredients__name',
-            'recipe_id__ingredients__measurement_unit',
-            Sum('recipe_id__ingredients__amount_ingredients__amount'))
-        ingredient_lst = set(ingredient_lst)
-        return send_message(ingredient_lst)
+        """Скачать список покупок, формат задается параметром ?format=."""
+        return shopping_list_response(
+            request.user, request.accepted_renderer.format
+        )
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(CatalogSnapshotMixin, viewsets.ModelViewSet):
     """Вьюсет для работы с тегами."""
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
+    catalog = CatalogSnapshot('tags', queryset, serializer_class)
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(CatalogSnapshotMixin, viewsets.ReadOnlyModelViewSet):
     """Вьюсет для работы с ингредиентами."""
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
-    filter_backends = [filters.SearchFilter]
-    search_fields = ('^name',)
     pagination_class = None
+    catalog = CatalogSnapshot('ingredients', queryset, serializer_class)
+
+    def list(self, request, *args, **kwargs):
+        """Поиск по началу названия идет через индекс в памяти.
+
+        С параметром fuzzy=1 поиск нечеткий, по индексу триграмм.
+        """
+        name = request.query_params.get(api_settings.SEARCH_PARAM, '').strip()
+        if not name:
+            return super().list(request, *args, **kwargs)
+        limit = settings.INGREDIENT_SEARCH_LIMIT
+        if request.query_params.get('fuzzy') in ('1', 'true'):
+            serializer = self.get_serializer(
+                IngredientTrigram.objects.search(name, limit), many=True
+            )
+            return Response(serializer.data)
+        return Response(ingredient_index.search(name, limit))
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """Ингредиенты, измененные и удаленные после версии ?since=."""
+        try:
+            since = int(request.query_params['since'])
+        except (KeyError, ValueError):
+            raise ValidationError(
+                {'since': 'Укажите версию каталога целым числом.'}
+            )
+        # Версия ответа берется из прочитанных строк, а не из кеша:
+        # следующий ?since= не пропустит изменений, которых клиент
+        # не видел.
+        versions = dict(IngredientChange.objects.filter(
+            version__gt=since
+        ).values_list('ingredient_id', 'version'))
+        version = max(versions.values(), default=since)
+        changed_ids = set(versions)
+        changed = self.get_serializer(
+            self.get_queryset().filter(id__in=changed_ids), many=True
+        ).data
+        return Response({
+            'version': version,
+            'changed': changed,
+            'removed': sorted(
+                changed_ids - {ingredient['id'] for ingredient in changed}
+            ),
+        })
 
 
 class CustomUserViewSet(UserViewSet, CreateDeleteMixin):
@@ -143,6 +246,12 @@ class CustomUserViewSet(UserViewSet, CreateDeleteMixin):
     queryset = User.objects.all()
     serializer_class = UserSerializer
 
+    @property
+    def count_versions(self):
+        if self.action == 'subscriptions':
+            return ('subscriptions',)
+        return ('users',)
+
     @action(detail=True, methods=['post', 'delete'])
     def subscribe(self, request, id):
         if request.method == 'POST':
@@ -157,13 +266,29 @@ class CustomUserViewSet(UserViewSet, CreateDeleteMixin):
                 serializer.data,
                 status=status.HTTP_201_CREATED
             )
-        self.delete_object(request, id, User, Subscription)
+        self.delete_object(request, id, Subscription)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=False, methods=['get'])
     def subscriptions(self, request):
-        user = request.user
-        authors = User.objects.filter(subscribing__user=user)
+        """Авторы из подписок с последними рецептами за один prefetch.
+
+        Последние ?recipes_limit= рецептов каждого автора отбираются
+        коррелированным подзапросом с LIMIT.
+        """
+        recipes = Recipe.objects.order_by('-pub_date', '-id')
+        recipes_limit = get_recipes_limit(request)
+        if recipes_limit is not None:
+            recipes = recipes.filter(pk__in=Subquery(
+                Recipe.objects.filter(
+                    author=OuterRef('author')
+                ).order_by('-pub_date', '-id').values('pk')[:recipes_limit]
+            ))
+        authors = User.objects.filter(
+            subscribing__user=request.user
+        ).prefetch_related(
+            Prefetch('recipes', queryset=recipes, to_attr='recent_recipes')
+        )
 
         paged_queryset = self.paginate_queryset(authors)
         serializer = SubscriptionReadSerializer(
@@ -0,0 +1,13 @@
+from django.db.models import F
+
+
+def change_counter(model, pks, field, delta):
+    """Атомарно изменить счетчик у строк модели на delta.
+
+    Уменьшение не опускает счетчик ниже нуля: расхождение исправит
+    команда reconcile_counters.
+    """
+    queryset = model.objects.filter(pk__in=pks)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta})
@@ -0,0 +1,103 @@
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import IntegerField, Value
+
+from core.versions import VERSION_KEY, bump_version_on_commit, get_version
+
+
+MEMBERSHIPS_KEY = 'memberships:{}'
+
+SOURCES = (
+    ('favorites', 'recipes.Favorite', 'recipe_id'),
+    ('shopping_cart', 'recipes.ShoppingCart', 'recipe_id'),
+    ('subscriptions', 'users.Subscription', 'author_id'),
+)
+
+Memberships = namedtuple(
+    'Memberships', [kind for kind, _, _ in SOURCES]
+)
+
+
+class SortedIds:
+    """Множество id поверх отсортированного массива.
+
+    Массив из 8-байтовых чисел занимает в кеше в разы меньше места,
+    чем set, а проверка вхождения — двоичный поиск.
+    """
+    __slots__ = ('items',)
+
+    def __init__(self, items=()):
+        self.items = items
+
+    def __contains__(self, pk):
+        position = bisect_left(self.items, pk)
+        return position < len(self.items) and self.items[position] == pk
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+EMPTY_MEMBERSHIPS = Memberships(*(SortedIds() for _ in SOURCES))
+
+
+def load_memberships(user_id):
+    """Прочитать id из всех трех таблиц одним запросом с UNION ALL."""
+    parts = [
+        apps.get_model(label).objects.filter(
+            user_id=user_id
+        ).order_by().annotate(
+            source=Value(number, output_field=IntegerField())
+        ).values_list(field, 'source')
+        for number, (_, label, field) in enumerate(SOURCES)
+    ]
+    ids = [[] for _ in SOURCES]
+    for pk, number in parts[0].union(*parts[1:], all=True):
+        ids[number].append(pk)
+    return {
+        kind: array('q', sorted(values))
+        for (kind, _, _), values in zip(SOURCES, ids)
+    }
+
+
+def get_memberships_version_name(user_id):
+    """Имя версии избранного, корзины и подписок пользователя."""
+    return f'memberships:{user_id}'
+
+
+def get_memberships(user_id):
+    """Избранное, корзина и подписки пользователя.
+
+    Массивы хранятся в общем кеше вместе с версией пользователя,
+    прочитанной до выборки из базы; запись другой версии загружается
+    заново. Версия и запись читаются одним обращением к кешу.
+    """
+    key = MEMBERSHIPS_KEY.format(user_id)
+    version_name = get_memberships_version_name(user_id)
+    version_key = VERSION_KEY.format(version_name)
+    cached = cache.get_many([key, version_key])
+    version = cached.get(version_key)
+    if version is None:
+        version = get_version(version_name)
+    entry = cached.get(key)
+    if entry is None or entry['version'] != version:
+        entry = {'version': version, 'data': load_memberships(user_id)}
+        cache.set(key, entry, settings.MEMBERSHIPS_CACHE_TTL)
+    data = entry['data']
+    return Memberships(*(SortedIds(data[kind]) for kind, _, _ in SOURCES))
+
+
+def invalidate_memberships(user_id):
+    """После коммита сменить версию избранного, корзины и подписок.
+
+    Массивы, загруженные до коммита, даже если их сохранят в кеш
+    позже, останутся со старой версией и будут загружены заново.
+    """
+    bump_version_on_commit(get_memberships_version_name(user_id))
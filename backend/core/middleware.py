@@ -0,0 +1,131 @@
+import cProfile
+import json
+import logging
+import re
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils import timezone
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from core.queries import collect_queries
+
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStatsMiddleware:
+    """Статистика SQL-запросов каждого запроса.
+
+    Пишет число запросов, время в базе и повторяющиеся шаблоны в лог,
+    а при DEBUG отдает их в заголовках X-Query-Count, X-Query-Time-Ms
+    и X-Query-Duplicates. Запросы, выполненные при отдаче потокового
+    ответа, не учитываются.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_STATS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with collect_queries() as stats:
+            response = self.get_response(request)
+        logger.debug(
+            '%s %s: %d запросов, %.1f мс',
+            request.method, request.path, stats.count, stats.duration * 1000
+        )
+        for sql, count in stats.duplicates.items():
+            logger.debug('Повтор x%d: %s', count, sql)
+        if settings.DEBUG:
+            response['X-Query-Count'] = stats.count
+            response['X-Query-Time-Ms'] = f'{stats.duration * 1000:.1f}'
+            response['X-Query-Duplicates'] = stats.duplicate_count
+        return response
+
+
+class ProfilingMiddleware:
+    """Профилирование отдельных запросов по запросу сотрудника.
+
+    Включается настройкой PROFILING_ENABLED. Запрос профилируется, если
+    в нем есть заголовок X-Profile или параметр ?profile=1 и его автор —
+    сотрудник. Дамп cProfile и сводка с долями SQL и Python сохраняются
+    в PROFILING_DIR, имя профиля возвращается в заголовке X-Profile-Id.
+    Потоковые ответы профилируются без отдачи тела.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self.is_requested(request) or not self.is_staff(request):
+            return self.get_response(request)
+        profile = cProfile.Profile()
+        with collect_queries() as stats:
+            start = time.perf_counter()
+            profile.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profile.disable()
+            duration = time.perf_counter() - start
+        response['X-Profile-Id'] = save_profile(
+            request, response, profile, stats, duration
+        )
+        return response
+
+    @staticmethod
+    def is_requested(request):
+        return (
+            'HTTP_X_PROFILE' in request.META
+            or request.GET.get('profile') == '1'
+        )
+
+    @staticmethod
+    def is_staff(request):
+        """Сотрудник ли автор запроса.
+
+        Проверяются классы аутентификации DRF, чтобы профилировать
+        и запросы с токеном, а не только с сессией.
+        """
+        drf_request = Request(request)
+        classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+        for authentication_class in classes:
+            try:
+                result = authentication_class().authenticate(drf_request)
+            except APIException:
+                return False
+            if result is not None:
+                return result[0].is_staff
+        user = getattr(request, 'user', None)
+        return bool(user and user.is_staff)
+
+
+def save_profile(request, response, profile, stats, duration):
+    directory = Path(settings.PROFILING_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    name = '{}-{}-{}'.format(
+        timezone.now().strftime('%Y%m%d-%H%M%S-%f'),
+        request.method.lower(),
+        re.sub(r'[^\w]+', '-', request.path).strip('-')[:80],
+    )
+    profile.dump_stats(str(directory / f'{name}.prof'))
+    summary = {
+        'method': request.method,
+        'path': request.get_full_path(),
+        'status': response.status_code,
+        'total_ms': round(duration * 1000, 2),
+        'sql_ms': round(stats.duration * 1000, 2),
+        'python_ms': round((duration - stats.duration) * 1000, 2),
+        'queries': stats.count,
+        'duplicates': stats.duplicates,
+    }
+    with open(directory / f'{name}.json', 'w', encoding='utf-8') as file:
+        json.dump(summary, file, ensure_ascii=False, indent=2)
+    return name
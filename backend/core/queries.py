@@ -0,0 +1,59 @@
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+
+IN_LIST = re.compile(r'IN \((?:%s|\?)(?:, (?:%s|\?))*\)')
+
+
+def get_fingerprint(sql):
+    """Шаблон запроса без параметров и с одинаковыми списками IN."""
+    return IN_LIST.sub('IN (...)', sql)
+
+
+class QueryStats:
+    """Число, суммарное время и шаблоны SQL-запросов.
+
+    Подключается к соединениям через execute_wrapper и видит все
+    запросы, выполненные через курсоры Django.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[get_fingerprint(sql)] += 1
+
+    @property
+    def duplicates(self):
+        """Шаблоны, выполненные больше одного раза, с числом повторов."""
+        return {
+            sql: count
+            for sql, count in self.fingerprints.items()
+            if count > 1
+        }
+
+    @property
+    def duplicate_count(self):
+        return sum(count - 1 for count in self.duplicates.values())
+
+
+@contextmanager
+def collect_queries():
+    """Собрать статистику запросов ко всем базам внутри блока."""
+    stats = QueryStats()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(stats))
+        yield stats
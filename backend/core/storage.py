@@ -0,0 +1,40 @@
+import os
+from hashlib import sha256
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Файловое хранилище с именами файлов по хешу содержимого.
+
+    Файл сохраняется в каталог загрузки под именем
+    <ab>/<cd>/<sha256><расширение>. Одинаковое содержимое получает одно
+    и то же имя, поэтому повторная загрузка не создает новый файл,
+    а URL файла никогда не меняет смысла.
+    """
+
+    def save(self, name, content, max_length=None):
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        digest = sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        digest = digest.hexdigest()
+        directory, filename = os.path.split(name)
+        name = os.path.join(
+            directory,
+            digest[:2],
+            digest[2:4],
+            digest + os.path.splitext(filename)[1].lower()
+        )
+        if self.exists(name):
+            # Обновить время изменения: иначе старый файл без ссылок
+            # удалит collect_orphan_images, пока транзакция рецепта,
+            # который на него сошлется, еще не завершилась.
+            os.utime(self.path(name))
+            return name
+        return super().save(name, content, max_length)
+
+
+content_addressed_storage = ContentAddressedStorage()
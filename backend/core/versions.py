@@ -0,0 +1,61 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+VERSION_KEY = 'version:{}'
+
+
+def _now():
+    return time.time_ns() // 1_000_000
+
+
+def get_version(name):
+    """Текущая версия набора данных.
+
+    Версия хранится в общем кеше и равна времени последнего изменения
+    в миллисекундах; если ее там нет, отсчет начинается заново.
+    """
+    key = VERSION_KEY.format(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _now(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def next_version(name):
+    """Версия, не меньше которой получит набор данных при смене."""
+    return max(_now(), (cache.get(VERSION_KEY.format(name)) or 0) + 1)
+
+
+def bump_version(name):
+    """Сменить версию набора данных после его изменения."""
+    version = next_version(name)
+    cache.set(VERSION_KEY.format(name), version, timeout=None)
+    return version
+
+
+def get_versions(names):
+    """Текущие версии нескольких наборов данных за одно обращение к кешу."""
+    keys = [VERSION_KEY.format(name) for name in names]
+    versions = cache.get_many(keys)
+    return [
+        versions[key] if key in versions else get_version(name)
+        for key, name in zip(keys, names)
+    ]
+
+
+def get_object_version_name(model, pk):
+    """Имя версии одной записи модели."""
+    return f'{model._meta.label_lower}:{pk}'
+
+
+def bump_version_on_commit(name):
+    """Сменить версию после коммита текущей транзакции.
+
+    Иначе конкурентный читатель успеет сохранить в кеш старые данные
+    под уже новой версией.
+    """
+    transaction.on_commit(lambda: bump_version(name))
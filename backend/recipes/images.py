@@ -0,0 +1,102 @@
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+from core.storage import content_addressed_storage
+from core.versions import bump_version, get_object_version_name
+from recipes.models import Recipe
+
+
+logger = logging.getLogger(__name__)
+
+# Расширение, формат Pillow и поддержка прозрачности.
+VARIANT_FORMATS = (
+    ('webp', 'WEBP', True),
+    ('jpeg', 'JPEG', False),
+)
+
+executor = ThreadPoolExecutor(
+    max_workers=max(settings.IMAGE_PIPELINE_WORKERS, 1),
+    thread_name_prefix='recipe-images',
+)
+
+
+def schedule_variants(recipe):
+    """После коммита транзакции собрать уменьшенные копии изображения.
+
+    Сборка идет в пуле потоков, чтобы не занимать обработчик запроса;
+    при IMAGE_PIPELINE_WORKERS = 0 выполняется сразу.
+    """
+    args = (recipe.pk, recipe.image.name)
+    if settings.IMAGE_PIPELINE_WORKERS:
+        transaction.on_commit(lambda: executor.submit(run_in_thread, *args))
+    else:
+        transaction.on_commit(lambda: build_variants(*args))
+
+
+def run_in_thread(recipe_id, name):
+    try:
+        build_variants(recipe_id, name)
+    except Exception:
+        logger.exception('Не удалось обработать изображение %s', name)
+    finally:
+        connection.close()
+
+
+def build_variants(recipe_id, name):
+    with content_addressed_storage.open(name) as file:
+        image = Image.open(file)
+        image.load()
+    image = ImageOps.exif_transpose(image)
+    image = image.convert('RGBA' if has_alpha(image) else 'RGB')
+    sizes = {}
+    for size_name, size in settings.IMAGE_VARIANT_SIZES.items():
+        variant = image.copy()
+        variant.thumbnail(size, Image.LANCZOS)
+        sizes[size_name] = {
+            extension: save_variant(
+                variant if alpha else flatten(variant),
+                extension,
+                image_format,
+            )
+            for extension, image_format, alpha in VARIANT_FORMATS
+        }
+    if Recipe.objects.filter(pk=recipe_id, image=name).update(
+        image_variants={'source': name, 'sizes': sizes}
+    ):
+        bump_version(get_object_version_name(Recipe, recipe_id))
+
+
+def has_alpha(image):
+    return image.mode in ('RGBA', 'LA', 'PA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+
+
+def flatten(image):
+    """Наложить изображение с прозрачностью на белый фон."""
+    if image.mode != 'RGBA':
+        return image
+    background = Image.new('RGB', image.size, 'white')
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def save_variant(image, extension, image_format):
+    """Сохранить копию без метаданных по пути из хеша содержимого."""
+    buffer = io.BytesIO()
+    image.save(
+        buffer,
+        image_format,
+        quality=settings.IMAGE_VARIANT_QUALITY,
+        optimize=True,
+    )
+    return content_addressed_storage.save(
+        f'recipes/variants/variant.{extension}',
+        ContentFile(buffer.getvalue())
+    )
@@ -0,0 +1,29 @@
+from django.core.management import BaseCommand
+
+from recipes.images import build_variants
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Сборка уменьшенных копий изображений рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Пересобрать копии и для уже обработанных рецептов',
+        )
+
+    def handle(self, *args, **options):
+        built = 0
+        for recipe in Recipe.objects.exclude(image='').iterator():
+            source = recipe.image_variants.get('source')
+            if source == recipe.image.name and not options['all']:
+                continue
+            try:
+                build_variants(recipe.pk, recipe.image.name)
+            except OSError as error:
+                self.stderr.write(f'{recipe.image.name}: {error}')
+                continue
+            built += 1
+        self.stdout.write(self.style.SUCCESS(f'Обработано рецептов: {built}'))
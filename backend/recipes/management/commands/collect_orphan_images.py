@@ -0,0 +1,66 @@
+import os
+from datetime import timedelta
+
+from django.core.management import BaseCommand
+from django.utils import timezone
+
+from core.storage import content_addressed_storage
+from recipes.models import Recipe
+
+
+IMAGE_DIRECTORIES = ('recipes/images', 'recipes/variants')
+
+
+class Command(BaseCommand):
+    help = 'Удаление изображений, на которые не ссылается ни один рецепт'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать файлы, которые будут удалены',
+        )
+        parser.add_argument(
+            '--grace',
+            type=int,
+            default=60,
+            help='Не трогать файлы моложе указанного числа минут',
+        )
+
+    def walk(self, directory):
+        if not content_addressed_storage.exists(directory):
+            return
+        directories, files = content_addressed_storage.listdir(directory)
+        for name in files:
+            yield os.path.join(directory, name)
+        for name in directories:
+            yield from self.walk(os.path.join(directory, name))
+
+    def get_referenced(self):
+        referenced = set()
+        recipes = Recipe.objects.values_list('image', 'image_variants')
+        for image, variants in recipes.iterator():
+            referenced.add(image)
+            for formats in variants.get('sizes', {}).values():
+                referenced.update(formats.values())
+        return referenced
+
+    def handle(self, *args, **options):
+        referenced = self.get_referenced()
+        border = timezone.now() - timedelta(minutes=options['grace'])
+        removed = 0
+        for directory in IMAGE_DIRECTORIES:
+            for name in self.walk(directory):
+                if name in referenced:
+                    continue
+                # Файл мог быть сохранен или загружен повторно рецептом,
+                # транзакция которого еще не завершилась.
+                modified = content_addressed_storage.get_modified_time(name)
+                if modified > border:
+                    continue
+                self.stdout.write(name)
+                if not options['dry_run']:
+                    content_addressed_storage.delete(name)
+                removed += 1
+        action = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(f'{action} файлов: {removed}'))
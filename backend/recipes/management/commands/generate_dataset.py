@@ -0,0 +1,239 @@
+import io
+import random
+from datetime import timedelta
+from itertools import accumulate
+from secrets import token_hex
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management import BaseCommand, CommandError, call_command
+from django.db.models import Max
+from django.utils import timezone
+from PIL import Image
+
+from core.storage import content_addressed_storage
+from core.versions import bump_version
+from recipes.images import build_variants
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    IngredientRecipes,
+    Recipe,
+    ShoppingCart,
+    Tag,
+)
+from users.models import Subscription, User
+
+
+BATCH_SIZE = 1000
+PASSWORD = 'synthetic-password'
+
+
+class Popularity:
+    """Выбор объектов с распределением Ципфа: первые в списке
+    выпадают заметно чаще остальных."""
+
+    def __init__(self, population, exponent=1.1):
+        self.population = list(population)
+        random.shuffle(self.population)
+        self.cum_weights = list(accumulate(
+            1 / rank ** exponent
+            for rank in range(1, len(self.population) + 1)
+        ))
+
+    def sample(self, count):
+        """До count разных объектов."""
+        count = min(count, len(self.population))
+        chosen = set()
+        for _ in range(count * 3):
+            chosen.update(random.choices(
+                self.population, cum_weights=self.cum_weights,
+                k=count - len(chosen)
+            ))
+            if len(chosen) >= count:
+                break
+        return chosen
+
+
+def get_count(mean):
+    """Число связей пользователя: у большинства мало, у немногих много."""
+    return int(random.expovariate(1 / mean)) if mean else 0
+
+
+def get_max_id(model):
+    return model.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+
+
+class Command(BaseCommand):
+    help = 'Генерация синтетических данных для нагрузочных замеров'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument(
+            '--favorites', type=float, default=20,
+            help='Среднее число избранных рецептов у пользователя',
+        )
+        parser.add_argument(
+            '--cart', type=float, default=5,
+            help='Среднее число рецептов в корзине у пользователя',
+        )
+        parser.add_argument(
+            '--subscriptions', type=float, default=5,
+            help='Среднее число подписок у пользователя',
+        )
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        ingredients = list(Ingredient.objects.values_list('id', flat=True))
+        tags = list(Tag.objects.values_list('id', flat=True))
+        if not ingredients or not tags:
+            raise CommandError(
+                'Сначала загрузите ингредиенты и теги: '
+                'load_ingredients, load_tags'
+            )
+        users = self.create_users(options['users'])
+        recipes, authors = self.create_recipes(
+            options['recipes'], users, ingredients, tags
+        )
+        popular_recipes = Popularity(recipes)
+        popular_authors = Popularity(authors)
+        self.create_relations(
+            Favorite, 'recipe_id', users, popular_recipes,
+            options['favorites']
+        )
+        self.create_relations(
+            ShoppingCart, 'recipe_id', users, popular_recipes,
+            options['cart']
+        )
+        self.create_relations(
+            Subscription, 'author_id', users, popular_authors,
+            options['subscriptions']
+        )
+        self.finish()
+
+    def create_users(self, count):
+        """Пользователи с одним общим заранее посчитанным паролем."""
+        last_id = get_max_id(User)
+        prefix = f'synthetic-{token_hex(3)}-'
+        password = make_password(PASSWORD)
+        User.objects.bulk_create(
+            (
+                User(
+                    username=f'{prefix}{number}',
+                    email=f'{prefix}{number}@example.com',
+                    first_name='Синтетический',
+                    last_name=f'Пользователь {number}',
+                    password=password,
+                )
+                for number in range(count)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        users = list(
+            User.objects.filter(id__gt=last_id).values_list('id', flat=True)
+        )
+        self.stdout.write(f'Пользователей: {len(users)}')
+        return users
+
+    def create_image(self):
+        """Одно изображение на все рецепты, копии собираются один раз."""
+        image = Image.linear_gradient('L').resize((1200, 800)).convert('RGB')
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', quality=85)
+        return content_addressed_storage.save(
+            'recipes/images/synthetic.jpg', ContentFile(buffer.getvalue())
+        )
+
+    def create_recipes(self, count, users, ingredients, tags):
+        last_id = get_max_id(Recipe)
+        image = self.create_image()
+        authors = Popularity(users)
+        Recipe.objects.bulk_create(
+            (
+                Recipe(
+                    author_id=next(iter(authors.sample(1))),
+                    name=f'Синтетический рецепт {number}',
+                    image=image,
+                    text='Описание синтетического рецепта. ' * 10,
+                    cooking_time=random.randint(5, 180),
+                )
+                for number in range(count)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        recipes = list(Recipe.objects.filter(id__gt=last_id).only('id'))
+        now = timezone.now()
+        for recipe in recipes:
+            recipe.pub_date = now - timedelta(
+                minutes=random.randint(0, 365 * 24 * 60)
+            )
+        Recipe.objects.bulk_update(
+            recipes, ['pub_date'], batch_size=BATCH_SIZE
+        )
+        self.create_recipe_relations(recipes, ingredients, tags)
+        if recipes:
+            build_variants(recipes[0].id, image)
+            Recipe.objects.filter(id__gt=last_id).update(
+                image_variants=Recipe.objects.get(
+                    id=recipes[0].id
+                ).image_variants
+            )
+        self.stdout.write(f'Рецептов: {len(recipes)}')
+        return [recipe.id for recipe in recipes], list(
+            Recipe.objects.filter(
+                id__gt=last_id
+            ).order_by().values_list('author_id', flat=True).distinct()
+        )
+
+    def create_recipe_relations(self, recipes, ingredients, tags):
+        """Ингредиенты и теги: популярные встречаются чаще."""
+        popular_ingredients = Popularity(ingredients)
+        popular_tags = Popularity(tags, exponent=0.7)
+        IngredientRecipes.objects.bulk_create(
+            (
+                IngredientRecipes(
+                    recipe_id=recipe.id,
+                    ingredient_id=ingredient_id,
+                    amount=random.randint(1, 500),
+                )
+                for recipe in recipes
+                for ingredient_id in popular_ingredients.sample(
+                    random.randint(3, 12)
+                )
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        Recipe.tags.through.objects.bulk_create(
+            (
+                Recipe.tags.through(recipe_id=recipe.id, tag_id=tag_id)
+                for recipe in recipes
+                for tag_id in popular_tags.sample(random.randint(1, 3))
+            ),
+            batch_size=BATCH_SIZE,
+        )
+
+    def create_relations(self, model, field, users, popularity, mean):
+        objects = [
+            model(user_id=user_id, **{field: target_id})
+            for user_id in users
+            for target_id in popularity.sample(get_count(mean))
+            if target_id != user_id or field != 'author_id'
+        ]
+        model.objects.bulk_create(
+            objects, batch_size=BATCH_SIZE, ignore_conflicts=True
+        )
+        self.stdout.write(f'{model._meta.verbose_name_plural}: {len(objects)}')
+
+    def finish(self):
+        """Вставки в обход сигналов: досчитать производные данные."""
+        call_command('reconcile_counters', stdout=self.stdout)
+        call_command('rebuild_shopping_lists', stdout=self.stdout)
+        for name in (
+            'users', 'recipes', 'favorites', 'shopping_cart', 'subscriptions'
+        ):
+            bump_version(name)
+        self.stdout.write(self.style.SUCCESS(
+            f'Данные созданы, пароль пользователей: {PASSWORD}'
+        ))
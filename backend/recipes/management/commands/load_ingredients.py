@@ -2,8 +2,9 @@ import csv
 
 from django.conf import settings
 from django.core.management import BaseCommand
+from django.db.models import Max
 
-from recipes.models import Ingredient
+from recipes.models import Ingredient, IngredientChange, IngredientTrigram
 
 
 class Command(BaseCommand):
@@ -11,6 +12,7 @@ class Command(BaseCommand):
 
     def handle(self, *args, **kwargs):
         data_path = settings.BASE_DIR
+        last_id = Ingredient.objects.aggregate(last_id=Max('id'))['last_id']
         with open(
             f'{data_path}/data/ingredients.csv',
             'r',
@@ -19,4 +21,9 @@ class Command(BaseCommand):
             reader = csv.DictReader(file)
             Ingredient.objects.bulk_create(
                 Ingredient(**data) for data in reader)
+        created = list(Ingredient.objects.filter(id__gt=last_id or 0))
+        IngredientTrigram.objects.index(created)
+        IngredientChange.objects.record(
+            ingredient.id for ingredient in created
+        )
         self.stdout.write(self.style.SUCCESS('Ингридиенты загружены!'))
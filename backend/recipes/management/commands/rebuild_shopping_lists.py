@@ -0,0 +1,38 @@
+from django.core.management import BaseCommand, CommandError
+
+from recipes.models import ShoppingListItem
+
+
+class Command(BaseCommand):
+    help = 'Пересборка материализованных списков покупок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить расхождения, ничего не меняя',
+        )
+
+    def handle(self, *args, **options):
+        expected = ShoppingListItem.objects.compute_totals()
+        stored = {
+            (user_id, ingredient_id): amount
+            for user_id, ingredient_id, amount
+            in ShoppingListItem.objects.values_list(
+                'user_id', 'ingredient_id', 'amount'
+            )
+        }
+        drift = {
+            key for key in expected.keys() | stored.keys()
+            if expected.get(key) != stored.get(key)
+        }
+        users = {user_id for user_id, _ in drift}
+        self.stdout.write(
+            f'Расхождений: {len(drift)}, пользователей: {len(users)}'
+        )
+        if options['check']:
+            if drift:
+                raise CommandError('Списки покупок не совпадают с корзинами')
+            return
+        ShoppingListItem.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS('Списки покупок пересобраны!'))
@@ -0,0 +1,52 @@
+from django.core.management import BaseCommand, CommandError
+from django.db.models import Count, F
+
+from recipes.models import Recipe
+from users.models import User
+
+
+COUNTERS = (
+    (Recipe, 'favorites_count', 'favorites'),
+    (Recipe, 'shopping_cart_count', 'cart'),
+    (User, 'recipes_count', 'recipes'),
+    (User, 'followers_count', 'subscribing'),
+)
+
+
+class Command(BaseCommand):
+    help = 'Сверка и исправление счетчиков рецептов и пользователей'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить расхождения, ничего не меняя',
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        for model, field, relation in COUNTERS:
+            drifted = list(
+                model.objects.annotate(
+                    expected=Count(relation)
+                ).exclude(
+                    **{field: F('expected')}
+                ).order_by().values_list('pk', 'expected')
+            )
+            total += len(drifted)
+            self.stdout.write(
+                f'{model._meta.model_name}.{field}: '
+                f'расхождений {len(drifted)}'
+            )
+            if options['check']:
+                continue
+            model.objects.bulk_update(
+                [model(pk=pk, **{field: expected})
+                 for pk, expected in drifted],
+                [field],
+                batch_size=1000
+            )
+        if options['check'] and total:
+            raise CommandError('Счетчики расходятся с данными')
+        if not options['check']:
+            self.stdout.write(self.style.SUCCESS('Счетчики сверены!'))
@@ -0,0 +1,46 @@
+# Generated by Django 3.2.16 on 2026-10-18 16:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from recipes.utils import get_trigrams
+
+
+def index_ingredients(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    IngredientTrigram = apps.get_model('recipes', 'IngredientTrigram')
+    IngredientTrigram.objects.bulk_create(
+        (
+            IngredientTrigram(ingredient_id=pk, trigram=trigram)
+            for pk, name in Ingredient.objects.values_list('id', 'name')
+            for trigram in get_trigrams(name)
+        ),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_shoppinglistitem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngredientTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3, verbose_name='Триграмма')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trigrams', to='recipes.ingredient', verbose_name='Ингредиент')),
+            ],
+            options={
+                'verbose_name': 'Триграмма ингредиента',
+                'verbose_name_plural': 'Триграммы ингредиентов',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='ingredienttrigram',
+            constraint=models.UniqueConstraint(fields=('trigram', 'ingredient'), name='unique_ingredient_trigram'),
+        ),
+        migrations.RunPython(index_ingredients, migrations.RunPython.noop),
+    ]
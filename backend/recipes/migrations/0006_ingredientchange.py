@@ -0,0 +1,26 @@
+# Generated by Django 3.2.16 on 2026-10-18 16:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_ingredienttrigram'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngredientChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ingredient_id', models.BigIntegerField(unique=True, verbose_name='ID ингредиента')),
+                ('version', models.BigIntegerField(db_index=True, verbose_name='Версия каталога')),
+            ],
+            options={
+                'verbose_name': 'Изменение ингредиента',
+                'verbose_name_plural': 'Изменения ингредиентов',
+                'ordering': ['version'],
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 3.2.16 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    User = apps.get_model('users', 'User')
+    counters = (
+        (Recipe, 'favorites_count', 'favorites'),
+        (Recipe, 'shopping_cart_count', 'cart'),
+        (User, 'recipes_count', 'recipes'),
+        (User, 'followers_count', 'subscribing'),
+    )
+    for model, field, relation in counters:
+        model.objects.bulk_update(
+            [
+                model(pk=pk, **{field: total})
+                for pk, total in model.objects.annotate(
+                    total=models.Count(relation)
+                ).filter(total__gt=0).order_by().values_list('pk', 'total')
+            ],
+            [field],
+            batch_size=1000
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_pub_date_id_idx'),
+        ('users', '0005_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество в избранных'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='shopping_cart_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество в корзинах'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
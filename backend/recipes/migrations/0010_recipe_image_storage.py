@@ -0,0 +1,19 @@
+# Generated by Django 3.2.16 on 2026-10-18 16:45
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(storage=core.storage.ContentAddressedStorage(), upload_to='recipes/images', verbose_name='Изображение'),
+        ),
+    ]
@@ -1,6 +1,14 @@
 from django.core.validators import MinValueValidator, RegexValidator
-from django.db import models
+from django.db import connections, models
+from django.db.models import ExpressionWrapper, OuterRef, Subquery
+from django.db.models.functions import Cast
+from django.db.transaction import atomic
 
+from core.counters import change_counter
+from core.memberships import invalidate_memberships
+from core.storage import content_addressed_storage
+from core.versions import bump_version_on_commit, next_version
+from recipes.utils import get_trigrams
 from users.models import User
 
 
@@ -24,6 +32,141 @@ class Ingredient(models.Model):
         return f'{self.name} - {self.measurement_unit}'
 
 
+class IngredientTrigramManager(models.Manager):
+    """Инвертированный индекс триграмм для нечеткого поиска ингредиентов."""
+    similarity_threshold = 0.3
+
+    @atomic
+    def index(self, ingredients):
+        ingredients = list(ingredients)
+        self.filter(ingredient__in=ingredients).delete()
+        self.bulk_create(
+            (
+                self.model(ingredient=ingredient, trigram=trigram)
+                for ingredient in ingredients
+                for trigram in get_trigrams(ingredient.name)
+            ),
+            batch_size=1000
+        )
+
+    def search(self, query, limit):
+        """Ингредиенты, похожие на запрос, по убыванию сходства.
+
+        Сходство считается как у pg_trgm: доля общих триграмм от их
+        объединения. Сходство, порядок и LIMIT считаются в базе, число
+        триграмм кандидата берется подзапросом по тому же индексу.
+        """
+        query_trigrams = get_trigrams(query)
+        if not query_trigrams:
+            return []
+        min_common = max(
+            1, int(len(query_trigrams) * self.similarity_threshold)
+        )
+        total = Subquery(
+            self.filter(
+                ingredient=OuterRef('ingredient')
+            ).order_by().values('ingredient').annotate(
+                total=models.Count('id')
+            ).values('total'),
+            output_field=models.IntegerField()
+        )
+        ranked = self.filter(
+            trigram__in=query_trigrams
+        ).values('ingredient').annotate(
+            common=models.Count('id'),
+            similarity=ExpressionWrapper(
+                Cast(models.Count('id'), models.FloatField()) / (
+                    total + len(query_trigrams) - models.Count('id')
+                ),
+                output_field=models.FloatField()
+            ),
+        ).filter(
+            common__gte=min_common,
+            similarity__gte=self.similarity_threshold,
+        ).order_by('-similarity', 'ingredient__name').values_list(
+            'ingredient', flat=True
+        )[:limit]
+        ingredient_ids = list(ranked)
+        ingredients = Ingredient.objects.in_bulk(ingredient_ids)
+        return [ingredients[pk] for pk in ingredient_ids]
+
+
+class IngredientTrigram(models.Model):
+    """Триграмма названия ингредиента."""
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='trigrams',
+        verbose_name='Ингредиент'
+    )
+    trigram = models.CharField(
+        'Триграмма',
+        max_length=3,
+    )
+
+    objects = IngredientTrigramManager()
+
+    class Meta:
+        verbose_name = 'Триграмма ингредиента'
+        verbose_name_plural = 'Триграммы ингредиентов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['trigram', 'ingredient'],
+                name='unique_ingredient_trigram'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.trigram} - {self.ingredient_id}'
+
+
+class IngredientChangeManager(models.Manager):
+
+    @atomic
+    def record(self, ingredient_ids):
+        """Записать изменение ингредиентов под новой версией каталога.
+
+        Для каждого ингредиента хранится только последнее изменение.
+        Версия в кеше меняется после коммита и не меньше записанной:
+        иначе читатель мог бы закешировать старый каталог под новой
+        версией.
+        """
+        ingredient_ids = list(ingredient_ids)
+        # Блокировка последней записи выстраивает записи журнала по
+        # очереди: версии коммитятся в порядке возрастания, и клиент
+        # синхронизации не пропустит более раннюю версию.
+        latest = self.select_for_update().order_by(
+            '-version'
+        ).values_list('version', flat=True).first()
+        version = max(next_version('ingredients'), (latest or 0) + 1)
+        self.filter(ingredient_id__in=ingredient_ids).delete()
+        self.bulk_create(
+            (
+                self.model(ingredient_id=ingredient_id, version=version)
+                for ingredient_id in ingredient_ids
+            ),
+            batch_size=1000
+        )
+        bump_version_on_commit('ingredients')
+        return version
+
+
+class IngredientChange(models.Model):
+    """Журнал изменений каталога ингредиентов."""
+    ingredient_id = models.BigIntegerField('ID ингредиента', unique=True)
+    version = models.BigIntegerField('Версия каталога', db_index=True)
+
+    objects = IngredientChangeManager()
+
+    class Meta:
+        verbose_name = 'Изменение ингредиента'
+        verbose_name_plural = 'Изменения ингредиентов'
+        ordering = ['version']
+
+    def __str__(self):
+        return f'{self.ingredient_id} - {self.version}'
+
+
 class Tag(models.Model):
     """Модель Тега."""
     name = models.CharField(
@@ -69,6 +212,7 @@ class Recipe(models.Model):
     image = models.ImageField(
         'Изображение',
         upload_to='recipes/images',
+        storage=content_addressed_storage,
     )
     text = models.TextField(
         'Описание',
@@ -95,11 +239,32 @@ class Recipe(models.Model):
         'Дата и время публикации рецепта',
         auto_now_add=True
     )
+    favorites_count = models.PositiveIntegerField(
+        'Количество в избранных',
+        default=0,
+        editable=False
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        'Количество в корзинах',
+        default=0,
+        editable=False
+    )
+    image_variants = models.JSONField(
+        'Уменьшенные копии изображения',
+        default=dict,
+        editable=False
+    )
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='recipe_pub_date_id_idx'
+            )
+        ]
 
     def __str__(self):
         return self.name
@@ -141,6 +306,142 @@ class IngredientRecipes(models.Model):
                 f'{self.ingredient.measurement_unit}')
 
 
+def lock_users(user_ids):
+    """Заблокировать строки пользователей до конца транзакции.
+
+    Так изменения списков одного пользователя идут по очереди даже
+    там, где блокировать нечего: select_for_update не видит строк,
+    которые конкурентная транзакция только собирается вставить.
+    Порядок по id исключает взаимные блокировки.
+    """
+    list(User.objects.select_for_update().filter(
+        pk__in=user_ids
+    ).order_by('pk').values_list('pk', flat=True))
+
+
+class RecipeRelationManager(models.Manager):
+    """Массовое добавление и удаление рецептов из списка пользователя.
+
+    INSERT и DELETE идут отдельными SQL-запросами без сигналов ORM,
+    поэтому счетчики рецептов, версии списков и версия закешированных
+    id пользователя обновляются здесь явно.
+    """
+    counter_field = None
+    version_name = None
+
+    def get_existing(self, recipe_ids):
+        """Id существующих рецептов из списка."""
+        return set(Recipe.objects.filter(
+            pk__in=recipe_ids
+        ).values_list('pk', flat=True))
+
+    def execute_returning(self, sql, params):
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(sql, params)
+            return [row[0] for row in cursor.fetchall()]
+
+    def get_columns(self):
+        """Таблица и столбцы пользователя и рецепта в кавычках."""
+        quote = connections[self.db].ops.quote_name
+        opts = self.model._meta
+        return (
+            quote(opts.db_table),
+            quote(opts.get_field('user').column),
+            quote(opts.get_field('recipe').column),
+        )
+
+    def insert_returning(self, user, recipe_ids):
+        """Вставить связи, которых еще нет, вернуть id вставленных рецептов.
+
+        INSERT ... SELECT берет только существующие рецепты по порядку
+        id, а ON CONFLICT DO NOTHING RETURNING возвращает ровно те
+        строки, что вставил этот запрос, даже при конкурентной вставке.
+        """
+        table, user_column, recipe_column = self.get_columns()
+        quote = connections[self.db].ops.quote_name
+        recipes = quote(Recipe._meta.db_table)
+        pk = quote(Recipe._meta.pk.column)
+        placeholders = ', '.join(['%s'] * len(recipe_ids))
+        return self.execute_returning(
+            f'INSERT INTO {table} ({user_column}, {recipe_column}) '
+            f'SELECT %s, {pk} FROM {recipes} WHERE {pk} IN ({placeholders}) '
+            f'ORDER BY {pk} '
+            f'ON CONFLICT DO NOTHING RETURNING {recipe_column}',
+            [user.id, *recipe_ids],
+        )
+
+    def delete_returning(self, user, recipe_ids):
+        """Удалить связи одним DELETE, вернуть id удаленных рецептов."""
+        table, user_column, recipe_column = self.get_columns()
+        placeholders = ', '.join(['%s'] * len(recipe_ids))
+        return self.execute_returning(
+            f'DELETE FROM {table} WHERE {user_column} = %s '
+            f'AND {recipe_column} IN ({placeholders}) '
+            f'RETURNING {recipe_column}',
+            [user.id, *recipe_ids],
+        )
+
+    def on_change(self, user, recipe_ids, delta):
+        change_counter(Recipe, recipe_ids, self.counter_field, delta)
+        bump_version_on_commit(self.version_name)
+        invalidate_memberships(user.id)
+
+    @atomic
+    def add_many(self, user, recipe_ids):
+        """Добавить рецепты, вернуть id существующих рецептов и новых.
+
+        Добавленными считаются строки, которые вставил сам INSERT, а не
+        отсутствовавшие при отдельной выборке: связь, добавленная
+        конкурентно, не будет учтена в счетчиках дважды.
+        """
+        existing = self.get_existing(recipe_ids)
+        if not existing:
+            return existing, []
+        added = self.insert_returning(user, sorted(existing))
+        if added:
+            self.on_change(user, added, 1)
+        return existing, added
+
+    @atomic
+    def remove(self, user, recipe_id):
+        """Убрать рецепт одним DELETE, вернуть True, если он был в списке."""
+        removed = self.delete_returning(user, [recipe_id])
+        if removed:
+            self.on_change(user, removed, -1)
+        return bool(removed)
+
+    @atomic
+    def remove_many(self, user, recipe_ids):
+        """Убрать рецепты, вернуть id существующих рецептов и убранных.
+
+        Убранными считаются строки, которые удалил сам DELETE.
+        """
+        existing = self.get_existing(recipe_ids)
+        if not existing:
+            return existing, []
+        removed = self.delete_returning(user, sorted(existing))
+        if removed:
+            self.on_change(user, removed, -1)
+        return existing, removed
+
+
+class FavoriteManager(RecipeRelationManager):
+    counter_field = 'favorites_count'
+    version_name = 'favorites'
+
+
+class ShoppingCartManager(RecipeRelationManager):
+    counter_field = 'shopping_cart_count'
+    version_name = 'shopping_cart'
+
+    def on_change(self, user, recipe_ids, delta):
+        super().on_change(user, recipe_ids, delta)
+        if delta > 0:
+            ShoppingListItem.objects.add_recipes(user.id, recipe_ids)
+        else:
+            ShoppingListItem.objects.remove_recipes(user.id, recipe_ids)
+
+
 class Favorite(models.Model):
     """Модель для избранных рецептов."""
     user = models.ForeignKey(
@@ -156,6 +457,8 @@ class Favorite(models.Model):
         verbose_name='Рецепт'
     )
 
+    objects = FavoriteManager()
+
     class Meta:
         verbose_name = 'Избранный рецепт'
         verbose_name_plural = 'Избранные рецепты'
@@ -186,6 +489,8 @@ class ShoppingCart(models.Model):
         verbose_name='Рецепт'
     )
 
+    objects = ShoppingCartManager()
+
     class Meta:
         verbose_name = 'Корзина покупок'
         verbose_name_plural = 'Корзина покупок'
@@ -199,3 +504,136 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return f'{self.user} добавил {self.recipe} в корзину покупок '
+
+
+class ShoppingListItemManager(models.Manager):
+    """Поддержка материализованного списка покупок в актуальном виде."""
+
+    def compute_totals(self):
+        """Пересчитать суммы ингредиентов по корзинам с нуля."""
+        rows = IngredientRecipes.objects.filter(
+            recipe__cart__isnull=False
+        ).values_list(
+            'recipe__cart__user', 'ingredient'
+        ).annotate(
+            total=models.Sum('amount')
+        ).order_by()
+        return {
+            (user_id, ingredient_id): total
+            for user_id, ingredient_id, total in rows
+        }
+
+    def recipe_amounts(self, recipe_ids):
+        """Суммарное количество каждого ингредиента в рецептах."""
+        return dict(
+            IngredientRecipes.objects.filter(
+                recipe_id__in=recipe_ids
+            ).values_list(
+                'ingredient'
+            ).annotate(
+                total=models.Sum('amount')
+            ).order_by()
+        )
+
+    @atomic
+    def apply_delta(self, user_ids, deltas):
+        """Изменить суммы ингредиентов пользователей на величину дельты."""
+        deltas = {key: value for key, value in deltas.items() if value}
+        if not user_ids or not deltas:
+            return
+        lock_users(user_ids)
+        items = {
+            (item.user_id, item.ingredient_id): item
+            for item in self.select_for_update().filter(
+                user_id__in=user_ids, ingredient_id__in=deltas
+            )
+        }
+        created, updated, deleted = [], [], []
+        for user_id in user_ids:
+            for ingredient_id, delta in deltas.items():
+                item = items.get((user_id, ingredient_id))
+                if item is None:
+                    if delta > 0:
+                        created.append(self.model(
+                            user_id=user_id,
+                            ingredient_id=ingredient_id,
+                            amount=delta
+                        ))
+                    continue
+                item.amount += delta
+                if item.amount > 0:
+                    updated.append(item)
+                else:
+                    deleted.append(item.pk)
+        self.bulk_create(created)
+        self.bulk_update(updated, ['amount'])
+        self.filter(pk__in=deleted).delete()
+
+    def add_recipes(self, user_id, recipe_ids):
+        self.apply_delta([user_id], self.recipe_amounts(recipe_ids))
+
+    def remove_recipes(self, user_id, recipe_ids):
+        self.apply_delta([user_id], {
+            ingredient_id: -total
+            for ingredient_id, total in self.recipe_amounts(
+                recipe_ids
+            ).items()
+        })
+
+    def change_recipe(self, recipe_id, deltas):
+        """Учесть изменение ингредиентов рецепта у всех, кто его добавил."""
+        if not any(deltas.values()):
+            return
+        user_ids = list(ShoppingCart.objects.filter(
+            recipe_id=recipe_id
+        ).order_by().values_list('user_id', flat=True))
+        self.apply_delta(user_ids, deltas)
+
+    @atomic
+    def rebuild(self):
+        self.all().delete()
+        self.bulk_create(
+            (
+                self.model(
+                    user_id=user_id,
+                    ingredient_id=ingredient_id,
+                    amount=total
+                )
+                for (user_id, ingredient_id), total
+                in self.compute_totals().items()
+            ),
+            batch_size=1000
+        )
+
+
+class ShoppingListItem(models.Model):
+    """Материализованный список покупок: сумма ингредиента по корзине."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='Ингредиент'
+    )
+    amount = models.PositiveIntegerField('Количество')
+
+    objects = ShoppingListItemManager()
+
+    class Meta:
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Список покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_list_item'
+            )
+        ]
+        ordering = ['user']
+
+    def __str__(self):
+        return f'{self.user}: {self.ingredient} - {self.amount}'
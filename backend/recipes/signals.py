@@ -0,0 +1,156 @@
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from core.counters import change_counter
+from core.memberships import invalidate_memberships
+from core.versions import bump_version_on_commit, get_object_version_name
+from recipes.images import schedule_variants
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    IngredientChange,
+    IngredientTrigram,
+    Recipe,
+    ShoppingCart,
+    ShoppingListItem,
+    Tag,
+)
+from users.models import User
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_to_shopping_list(sender, instance, created, **kwargs):
+    if created:
+        ShoppingListItem.objects.add_recipes(
+            instance.user_id, [instance.recipe_id]
+        )
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def remove_from_shopping_list(sender, instance, **kwargs):
+    # pre_delete: при каскадном удалении рецепта его ингредиенты
+    # к моменту post_delete могут быть уже удалены.
+    ShoppingListItem.objects.remove_recipes(
+        instance.user_id, [instance.recipe_id]
+    )
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def record_ingredient_change(sender, instance, **kwargs):
+    IngredientChange.objects.record([instance.pk])
+
+
+@receiver(post_save, sender=Ingredient)
+def index_ingredient_trigrams(sender, instance, **kwargs):
+    IngredientTrigram.objects.index([instance])
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def bump_tags_version(sender, **kwargs):
+    bump_version_on_commit('tags')
+
+
+COUNT_VERSIONS = {
+    Recipe: 'recipes',
+    Favorite: 'favorites',
+    ShoppingCart: 'shopping_cart',
+}
+
+
+RECIPE_COUNTERS = {
+    Favorite: 'favorites_count',
+    ShoppingCart: 'shopping_cart_count',
+}
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def bump_count_version_on_create(sender, created, **kwargs):
+    if created:
+        bump_version_on_commit(COUNT_VERSIONS[sender])
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def bump_count_version_on_delete(sender, **kwargs):
+    bump_version_on_commit(COUNT_VERSIONS[sender])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def bump_recipes_version_on_tags(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_version_on_commit('recipes')
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def increment_recipe_counter(sender, instance, created, **kwargs):
+    if created:
+        change_counter(
+            Recipe, [instance.recipe_id], RECIPE_COUNTERS[sender], 1
+        )
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def decrement_recipe_counter(sender, instance, **kwargs):
+    change_counter(Recipe, [instance.recipe_id], RECIPE_COUNTERS[sender], -1)
+
+
+@receiver(post_save, sender=Recipe)
+def increment_author_recipes(sender, instance, created, **kwargs):
+    if created:
+        change_counter(User, [instance.author_id], 'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_author_recipes(sender, instance, **kwargs):
+    change_counter(User, [instance.author_id], 'recipes_count', -1)
+
+
+@receiver(post_save, sender=Recipe)
+def process_recipe_image(sender, instance, **kwargs):
+    if (
+        instance.image
+        and instance.image_variants.get('source') != instance.image.name
+    ):
+        schedule_variants(instance)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def bump_recipe_version(sender, instance, **kwargs):
+    # Ингредиенты рецепта меняются только вместе с сохранением рецепта,
+    # поэтому отдельных сигналов для IngredientRecipes не нужно.
+    bump_version_on_commit(get_object_version_name(Recipe, instance.pk))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def bump_recipe_version_on_tags(sender, instance, action, reverse, pk_set,
+                                **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    for pk in (pk_set or ()) if reverse else (instance.pk,):
+        bump_version_on_commit(get_object_version_name(Recipe, pk))
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def add_membership(sender, instance, created, **kwargs):
+    if created:
+        invalidate_memberships(instance.user_id)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def remove_membership(sender, instance, **kwargs):
+    invalidate_memberships(instance.user_id)
@@ -0,0 +1,19 @@
+import re
+
+
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def get_trigrams(text):
+    """Множество триграмм строки в духе pg_trgm.
+
+    Каждое слово приводится к нижнему регистру, «ё» заменяется на «е»,
+    слово дополняется двумя пробелами в начале и одним в конце.
+    """
+    trigrams = set()
+    for word in WORD_PATTERN.findall(text.lower().replace('ё', 'е')):
+        word = f'  {word} '
+        trigrams.update(
+            word[index:index + 3] for index in range(len(word) - 2)
+        )
+    return trigrams
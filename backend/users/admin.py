@@ -7,7 +7,7 @@ from users.models import User
 class UserAdmin(admin.ModelAdmin):
     list_display = (
         'id', 'username', 'email',
-        'first_name', 'last_name')
+        'first_name', 'last_name', 'recipes_count', 'followers_count')
     search_fields = ('email', 'username', 'first_name', 'last_name')
     list_filter = ('email', 'first_name')
     empty_value_display = '-пусто-'
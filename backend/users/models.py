@@ -1,5 +1,10 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import connections, models
+from django.db.transaction import atomic
+
+from core.counters import change_counter
+from core.memberships import invalidate_memberships
+from core.versions import bump_version_on_commit
 
 
 class User(AbstractUser):
@@ -29,6 +34,16 @@ class User(AbstractUser):
         blank=False,
         null=False
     )
+    recipes_count = models.PositiveIntegerField(
+        'Количество рецептов',
+        default=0,
+        editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков',
+        default=0,
+        editable=False
+    )
 
     class Meta:
         verbose_name = 'Пользователь'
@@ -39,6 +54,33 @@ class User(AbstractUser):
         return self.first_name
 
 
+class SubscriptionManager(models.Manager):
+
+    @atomic
+    def remove(self, user, author_id):
+        """Отписаться одним DELETE, вернуть True, если подписка была.
+
+        Удаление идет без сигналов post_delete, поэтому счетчик
+        подписчиков, версия подписок и версия закешированных id
+        пользователя обновляются здесь.
+        """
+        quote = connections[self.db].ops.quote_name
+        opts = self.model._meta
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {quote(opts.db_table)} '
+                f'WHERE {quote(opts.get_field("user").column)} = %s '
+                f'AND {quote(opts.get_field("author").column)} = %s',
+                [user.id, author_id],
+            )
+            removed = cursor.rowcount
+        if removed:
+            change_counter(User, [author_id], 'followers_count', -1)
+            bump_version_on_commit('subscriptions')
+            invalidate_memberships(user.id)
+        return bool(removed)
+
+
 class Subscription(models.Model):
     user = models.ForeignKey(
         User,
@@ -53,6 +95,8 @@ class Subscription(models.Model):
         verbose_name='Автор'
     )
 
+    objects = SubscriptionManager()
+
     class Meta:
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
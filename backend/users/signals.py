@@ -0,0 +1,56 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.counters import change_counter
+from core.memberships import invalidate_memberships
+from core.versions import bump_version_on_commit, get_object_version_name
+from users.models import Subscription, User
+
+
+COUNT_VERSIONS = {
+    User: 'users',
+    Subscription: 'subscriptions',
+}
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Subscription)
+def bump_count_version_on_create(sender, created, **kwargs):
+    if created:
+        bump_version_on_commit(COUNT_VERSIONS[sender])
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Subscription)
+def bump_count_version_on_delete(sender, **kwargs):
+    bump_version_on_commit(COUNT_VERSIONS[sender])
+
+
+@receiver(post_save, sender=Subscription)
+def increment_followers(sender, instance, created, **kwargs):
+    if created:
+        change_counter(User, [instance.author_id], 'followers_count', 1)
+
+
+@receiver(post_delete, sender=Subscription)
+def decrement_followers(sender, instance, **kwargs):
+    change_counter(User, [instance.author_id], 'followers_count', -1)
+
+
+@receiver(post_save, sender=User)
+def bump_user_version(sender, instance, update_fields, **kwargs):
+    # Вход пользователя сохраняет только last_login: профиль не меняется.
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    bump_version_on_commit(get_object_version_name(User, instance.pk))
+
+
+@receiver(post_save, sender=Subscription)
+def add_subscription_membership(sender, instance, created, **kwargs):
+    if created:
+        invalidate_memberships(instance.user_id)
+
+
+@receiver(post_delete, sender=Subscription)
+def remove_subscription_membership(sender, instance, **kwargs):
+    invalidate_memberships(instance.user_id)